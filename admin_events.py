@@ -0,0 +1,227 @@
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (last interest_data.id, last email_subscribers.id) seen by a stream
+Cursor = Tuple[int, int]
+
+
+def format_event_id(cursor: Cursor) -> str:
+    return f"{cursor[0]}-{cursor[1]}"
+
+
+def parse_event_id(value: Optional[str]) -> Optional[Cursor]:
+    """Parse a Last-Event-ID; anything malformed starts a fresh snapshot"""
+    if not value:
+        return None
+    try:
+        interest_id, subscriber_id = (int(part) for part in value.split("-"))
+    except ValueError:
+        return None
+    if interest_id < 0 or subscriber_id < 0:
+        return None
+    return interest_id, subscriber_id
+
+
+def format_sse(event: str, data: dict, cursor: Cursor) -> str:
+    return f"id: {format_event_id(cursor)}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _totals(conn) -> dict:
+    rows = dict(conn.execute(
+        "SELECT name, value FROM counters WHERE name IN ('interest_data', 'email_subscribers')"
+    ))
+    return {
+        "total_interest": rows.get("interest_data", 0),
+        "total_subscribers": rows.get("email_subscribers", 0),
+    }
+
+
+def fetch_since(conn, cursor: Cursor, limit: int) -> dict:
+    """New rows after `cursor` (oldest first, up to `limit` per table) plus current totals"""
+    interest = [
+        {"id": row_id, "timestamp": timestamp}
+        for row_id, timestamp in conn.execute(
+            'SELECT id, timestamp FROM interest_data WHERE id > ? ORDER BY id LIMIT ?', (cursor[0], limit)
+        )
+    ]
+    subscribers = [
+        {"id": row_id, "email": email, "timestamp": timestamp}
+        for row_id, email, timestamp in conn.execute(
+            'SELECT id, email, timestamp FROM email_subscribers WHERE id > ? ORDER BY id LIMIT ?', (cursor[1], limit)
+        )
+    ]
+    return {"totals": _totals(conn), "interest": interest, "subscribers": subscribers}
+
+
+def fetch_snapshot(conn, recent: int) -> Tuple[dict, Cursor]:
+    """Totals and the newest `recent` rows of each table, read in one transaction"""
+    conn.execute('BEGIN')
+    try:
+        cursor = (
+            conn.execute('SELECT COALESCE(MAX(id), 0) FROM interest_data').fetchone()[0],
+            conn.execute('SELECT COALESCE(MAX(id), 0) FROM email_subscribers').fetchone()[0],
+        )
+        interest = [
+            {"id": row_id, "timestamp": timestamp}
+            for row_id, timestamp in conn.execute(
+                'SELECT id, timestamp FROM interest_data ORDER BY id DESC LIMIT ?', (recent,)
+            )
+        ]
+        subscribers = [
+            {"id": row_id, "email": email, "timestamp": timestamp}
+            for row_id, email, timestamp in conn.execute(
+                'SELECT id, email, timestamp FROM email_subscribers ORDER BY id DESC LIMIT ?', (recent,)
+            )
+        ]
+        totals = _totals(conn)
+    finally:
+        conn.rollback()
+    data = {"totals": totals, "interest": interest[::-1], "subscribers": subscribers[::-1]}
+    return data, cursor
+
+
+def advance(cursor: Cursor, delta: dict) -> Cursor:
+    return (
+        delta["interest"][-1]["id"] if delta["interest"] else cursor[0],
+        delta["subscribers"][-1]["id"] if delta["subscribers"] else cursor[1],
+    )
+
+
+class _Client:
+    __slots__ = ("queue",)
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+
+class AdminEventHub:
+    """Push new interest rows, new subscribers and totals to admin dashboards.
+
+    The hub is notified from the write path (via pub/sub, so other workers'
+    writes arrive too). Notifications are coalesced: at most one query per
+    `interval`, however many tabs are open, and the resulting delta is
+    shared by every stream. Event ids are "<interest id>-<subscriber id>"
+    cursors, so a reconnecting EventSource replays exactly the rows it
+    missed. A stream that falls `queue_size` deltas behind is closed and
+    recovers the same way.
+    """
+
+    def __init__(self, db, interval: float = 0.25, heartbeat: float = 15.0, queue_size: int = 64,
+                 recent: int = 5, page_size: int = 500):
+        self.db = db
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.queue_size = queue_size
+        self.recent = recent
+        self.page_size = page_size
+        self._clients: Set[_Client] = set()
+        self._cursor: Optional[Cursor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._dirty = False
+        self.refreshes = 0
+        self.dropped = 0
+
+    def notify(self, event: Optional[dict] = None):
+        """Called on every write; schedules one coalesced refresh"""
+        if not self._clients:
+            # Nobody listening: forget the cursor instead of tracking rows
+            self._cursor = None
+            return
+        self._dirty = True
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._refresh())
+
+    async def _refresh(self):
+        try:
+            while self._dirty and self._clients and self._cursor is not None:
+                self._dirty = False
+                await asyncio.sleep(self.interval)
+                while self._cursor is not None:
+                    delta = await self.db.read(fetch_since, self._cursor, self.page_size)
+                    self._cursor = advance(self._cursor, delta)
+                    self.refreshes += 1
+                    self._push(delta)
+                    if len(delta["interest"]) < self.page_size and len(delta["subscribers"]) < self.page_size:
+                        break
+        except Exception:
+            logger.exception("Admin event refresh failed")
+        finally:
+            self._task = None
+
+    def _push(self, delta: dict):
+        for client in list(self._clients):
+            try:
+                client.queue.put_nowait(delta)
+            except asyncio.QueueFull:
+                # Too far behind: end the stream and let EventSource resume
+                self._clients.discard(client)
+                self.dropped += 1
+                while not client.queue.empty():
+                    client.queue.get_nowait()
+                client.queue.put_nowait(None)
+
+    def _register(self, client: _Client, cursor: Cursor):
+        self._clients.add(client)
+        if self._cursor is None:
+            self._cursor = cursor
+            # Catch anything committed while the hub had no cursor
+            self.notify()
+
+    async def stream(self, last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+        """SSE body for one dashboard: a snapshot or replay, then live deltas"""
+        client = _Client(self.queue_size)
+        try:
+            yield "retry: 3000\n\n"
+            cursor, totals = parse_event_id(last_event_id), None
+            registered = False
+            if cursor is None:
+                data, cursor = await self.db.read(fetch_snapshot, self.recent)
+                totals = data["totals"]
+                yield format_sse("snapshot", data, cursor)
+                self._register(client, cursor)
+                registered = True
+            # Replay the rows after the cursor (on resume: register once caught up, then read
+            # again). Rows committed before registering are read here, later ones are queued,
+            # and the live loop drops the overlap by cursor.
+            while True:
+                delta = await self.db.read(fetch_since, cursor, self.page_size)
+                if delta["interest"] or delta["subscribers"] or delta["totals"] != totals:
+                    cursor, totals = advance(cursor, delta), delta["totals"]
+                    yield format_sse("delta", delta, cursor)
+                if len(delta["interest"]) < self.page_size and len(delta["subscribers"]) < self.page_size:
+                    if registered:
+                        break
+                    self._register(client, cursor)
+                    registered = True
+
+            while True:
+                try:
+                    delta = await asyncio.wait_for(client.queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if delta is None:
+                    return
+                # Drop rows this stream already has (e.g. from its replay)
+                delta = {
+                    "totals": delta["totals"],
+                    "interest": [row for row in delta["interest"] if row["id"] > cursor[0]],
+                    "subscribers": [row for row in delta["subscribers"] if row["id"] > cursor[1]],
+                }
+                if not delta["interest"] and not delta["subscribers"] and delta["totals"] == totals:
+                    continue
+                cursor, totals = advance(cursor, delta), delta["totals"]
+                yield format_sse("delta", delta, cursor)
+        finally:
+            self._clients.discard(client)
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self._clients),
+            "refreshes": self.refreshes,
+            "dropped": self.dropped,
+        }
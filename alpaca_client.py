@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, Optional, Sequence
+
+from metrics import ALPACA_LATENCY, ALPACA_RETRIES
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying; everything else in the 4xx range is a caller error
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class AlpacaError(Exception):
+    """Raised when Alpaca rejects a request or keeps failing after all retries"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class CircuitOpenError(AlpacaError):
+    """Raised without touching the network while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Fail fast after repeated upstream failures.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    rejects calls for `reset_timeout` seconds, then lets a single trial call
+    through (half-open). A success closes it again, a failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """End a trial call that produced no outcome (e.g. it was cancelled)"""
+        self._trial_in_flight = False
+
+
+class AlpacaClient:
+    """Async Alpaca market data client sharing one pooled aiohttp session.
+
+    The session is opened on the first request (or by `start()`) inside the
+    running event loop; aiohttp is imported then too, keeping it off the
+    startup path. Call `close()` on shutdown.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        api_secret: str,
+        connect_timeout: float = 3.0,
+        read_timeout: float = 10.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.25,
+        backoff_max: float = 4.0,
+        pool_size: int = 20,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.base_url = (base_url or "").rstrip("/")
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.pool_size = pool_size
+        self.breaker = breaker or CircuitBreaker()
+        self._session: Optional["aiohttp.ClientSession"] = None
+
+    async def start(self):
+        if self._session is not None:
+            return
+        import aiohttp
+
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(
+                total=None,
+                sock_connect=self.connect_timeout,
+                sock_read=self.read_timeout,
+            ),
+            headers={
+                "APCA-API-KEY-ID": self.api_key or "",
+                "APCA-API-SECRET-KEY": self.api_secret or "",
+            },
+            raise_for_status=False,
+        )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def get_json(self, path: str, params: dict) -> dict:
+        import aiohttp
+
+        await self.start()
+
+        url = f"{self.base_url}{path}"
+        last_error = None
+        for attempt in range(self.max_retries):
+            trial = self.breaker.state == "half_open"
+            if not self.breaker.allow():
+                raise CircuitOpenError("Alpaca circuit breaker is open")
+
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                async with self._session.get(url, params=params) as response:
+                    outcome = str(response.status)
+                    if response.status == 200:
+                        data = await response.json()
+                        self.breaker.record_success()
+                        return data
+
+                    body = await response.text()
+                    if response.status not in RETRYABLE_STATUS:
+                        # The upstream is healthy, the request itself is wrong
+                        self.breaker.record_success()
+                        raise AlpacaError(
+                            f"Alpaca request failed with status {response.status}: {body[:200]}",
+                            status=response.status,
+                        )
+                    last_error = AlpacaError(
+                        f"Alpaca returned status {response.status}", status=response.status
+                    )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                outcome = "timeout" if isinstance(e, asyncio.TimeoutError) else "error"
+                last_error = e
+            finally:
+                ALPACA_LATENCY.observe(time.perf_counter() - started, path=path, outcome=outcome)
+                if trial:
+                    # A cancelled trial records no outcome; free the slot or every later call is rejected
+                    self.breaker.release()
+
+            self.breaker.record_failure()
+            logger.warning(
+                "Alpaca request attempt %d/%d failed: %s", attempt + 1, self.max_retries, last_error
+            )
+            if attempt < self.max_retries - 1:
+                ALPACA_RETRIES.inc(path=path)
+                await asyncio.sleep(self._backoff(attempt))
+
+        raise AlpacaError(f"Alpaca request failed after {self.max_retries} attempts: {last_error}")
+
+    async def get_multi_bars(self, symbols: Sequence[str], start: str, end: str, timeframe: str = "1Day",
+                             limit: int = 10000) -> Dict[str, list]:
+        """Return bars per symbol between `start` and `end` (inclusive), following next_page_token"""
+        params = {"symbols": ",".join(symbols), "start": start, "end": end, "timeframe": timeframe, "limit": limit}
+        bars: Dict[str, list] = {}
+        while True:
+            data = await self.get_json("/stocks/bars", params)
+            for symbol, page in (data.get("bars") or {}).items():
+                bars.setdefault(symbol, []).extend(page)
+            token = data.get("next_page_token")
+            if not token:
+                return bars
+            params = {**params, "page_token": token}
+
+    async def get_bars(self, symbol: str, start: str, end: str, timeframe: str = "1Day", limit: int = 10000) -> list:
+        """Return the bars for one symbol between `start` and `end` (inclusive)"""
+        return (await self.get_multi_bars([symbol], start, end, timeframe, limit)).get(symbol, [])
@@ -0,0 +1,93 @@
+"""Local stand-in for the Alpaca market data API.
+
+Serves deterministic synthetic daily bars from `/stocks/bars` so the app,
+tests and benchmarks can run without credentials or network access. Latency
+and failures can be injected to exercise timeouts, retries and the circuit
+breaker:
+
+    python alpaca_stub.py --port 8001 --latency 0.5 --fail-rate 0.2
+
+then point the app at it with ALPACA_BASE_URL=http://127.0.0.1:8001
+"""
+import argparse
+import asyncio
+import math
+import random
+from datetime import date, timedelta
+
+from aiohttp import web
+
+
+def synthetic_close(symbol: str, day: date) -> float:
+    """Deterministic, gently trending price series per symbol, positive back to the 1990s"""
+    offset = sum(ord(ch) for ch in symbol) % 50
+    t = (day - date(2000, 1, 1)).days
+    return round((100 + offset) * math.exp(t * 0.0002) + 8 * math.sin(t / 30), 2)
+
+
+def synthetic_bars(symbol: str, start: date, end: date) -> list:
+    bars = []
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            close = synthetic_close(symbol, day)
+            bars.append({
+                "t": f"{day.isoformat()}T04:00:00Z",
+                "o": close - 0.5,
+                "h": close + 1.0,
+                "l": close - 1.0,
+                "c": close,
+                "v": 1_000_000,
+            })
+        day += timedelta(days=1)
+    return bars
+
+
+def create_stub_app(latency: float = 0.0, fail_rate: float = 0.0, fail_status: int = 503,
+                    fail_first: int = 0) -> web.Application:
+    """`fail_first` fails that many requests before any others, for deterministic retry tests"""
+    app = web.Application()
+    app["stats"] = {"requests": 0, "failures": 0}
+
+    async def bars_handler(request: web.Request) -> web.Response:
+        app["stats"]["requests"] += 1
+        if latency:
+            await asyncio.sleep(latency)
+        if app["stats"]["requests"] <= fail_first or (fail_rate and random.random() < fail_rate):
+            app["stats"]["failures"] += 1
+            return web.json_response({"message": "injected failure"}, status=fail_status)
+
+        query = request.query
+        symbols = [s for s in query.get("symbols", "").split(",") if s]
+        start = date.fromisoformat(query["start"][:10])
+        end = date.fromisoformat(query.get("end", date.today().isoformat())[:10])
+        limit = int(query.get("limit", 1000))
+        offset = int(query.get("page_token") or 0)
+
+        # Alpaca pages across all symbols with a shared limit
+        rows = [(symbol, bar) for symbol in symbols for bar in synthetic_bars(symbol, start, end)]
+        page = rows[offset:offset + limit]
+        bars = {}
+        for symbol, bar in page:
+            bars.setdefault(symbol, []).append(bar)
+        next_token = str(offset + limit) if offset + limit < len(rows) else None
+        return web.json_response({"bars": bars, "next_page_token": next_token})
+
+    app.router.add_get("/stocks/bars", bars_handler)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before answering")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--fail-status", type=int, default=503)
+    parser.add_argument("--fail-first", type=int, default=0, help="fail this many requests before any others")
+    args = parser.parse_args()
+    web.run_app(
+        create_stub_app(args.latency, args.fail_rate, args.fail_status, args.fail_first),
+        host=args.host,
+        port=args.port,
+    )
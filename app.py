@@ -1,48 +1,259 @@
-from fastapi import FastAPI, Request, HTTPException, Depends, WebSocket, Response
+import time
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, Request, HTTPException, Depends, Query, WebSocket, WebSocketDisconnect, Response
 from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
-from datetime import datetime, timedelta
-import requests
+from datetime import date, datetime, timedelta
 import json
-import time
+import secrets
 import sqlite3
 import os
-import shutil
-from typing import List, Any
+from typing import List, Optional
 from config import (
     ALPACA_API_KEY,
     ALPACA_API_SECRET,
     ALPACA_BASE_URL,
     APP_NAME,
     APP_DESCRIPTION,
-    APP_EMAIL
+    APP_EMAIL,
+    ALPACA_CONNECT_TIMEOUT,
+    ALPACA_READ_TIMEOUT,
+    ALPACA_MAX_RETRIES,
+    ALPACA_POOL_SIZE,
+    BAR_STORE_PATH,
+    BACKTEST_HISTORY_START,
+    BARS_MAX_SYMBOLS,
+    BARS_SYMBOLS_PER_REQUEST,
+    BARS_MAX_CONCURRENCY,
+    MONTE_CARLO_WORKERS,
+    MONTE_CARLO_CHUNK_PATHS,
+    MONTE_CARLO_PARALLEL_THRESHOLD,
+    MONTE_CARLO_CACHE_SIZE,
+    MONTE_CARLO_MAX_PATHS,
+    MONTE_CARLO_MAX_CONCURRENCY,
+    MARKET_DATA_SETTLE_MINUTES,
+    WRITE_BATCH_SIZE,
+    WRITE_BATCH_DELAY_MS,
+    BACKUP_DIR,
+    BACKUP_INTERVAL_SECONDS,
+    BACKUP_CHANGE_THRESHOLD,
+    BACKUP_KEEP,
+    BACKUP_COMPRESS,
+    DATABASE_PATH,
+    DB_READERS,
+    DB_MMAP_SIZE,
+    DB_CACHE_SIZE_KIB,
+    BROADCAST_INTERVAL_MS,
+    BROADCAST_QUEUE_SIZE,
+    BROADCAST_SEND_TIMEOUT,
+    PUBSUB_BACKEND,
+    PUBSUB_POLL_INTERVAL_MS,
+    EXPORT_BATCH_SIZE,
+    EXPORT_MAX_PAGE_SIZE,
+    EXPORT_MAX_STREAMS,
+    ADMIN_EVENTS_INTERVAL_MS,
+    ADMIN_EVENTS_HEARTBEAT_SECONDS,
+    LOG_LEVEL,
+    COMPRESSION_MINIMUM_SIZE,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_BROTLI_QUALITY,
+    STARTUP_BUDGET_MS,
+    INTEREST_RATE_PER_SECOND,
+    INTEREST_BURST,
+    INTEREST_MAX_CONCURRENCY,
+    SUBSCRIBE_RATE_PER_SECOND,
+    SUBSCRIBE_BURST,
+    SUBSCRIBE_MAX_CONCURRENCY,
+    RATE_LIMIT_MAX_CLIENTS,
+    ARCHIVE_DIR,
+    ARCHIVE_AFTER_DAYS,
+    ARCHIVE_INTERVAL_SECONDS,
+    ARCHIVE_COMPRESSION,
+    missing_settings
 )
 from dotenv import load_dotenv
-import pandas as pd
-import io
 import asyncio
-import aiohttp
 import logging
-from starlette.middleware.base import BaseHTTPMiddleware
+from contextlib import asynccontextmanager
 from starlette.responses import Response
 from starlette.types import ASGIApp, Receive, Scope, Send
+from admin_events import AdminEventHub
+from alpaca_client import AlpacaClient, AlpacaError
+from archive import InterestArchive
+from backup import BackupScheduler
+from bar_store import BarFetcher, BarStore, align_bars, bars_window, parse_fields, parse_symbols
+from broadcaster import Broadcaster
+from database import Database
+from exports import (
+    EXPORT_TABLES,
+    ExportStreams,
+    csv_export,
+    json_export,
+    json_page,
+    ndjson_export,
+    parse_since,
+    select_rows,
+    stream_export,
+    with_archive
+)
+from hll import (
+    STANDARD_ERROR,
+    count_distinct,
+    count_visitors,
+    create_hll_schema,
+    estimate_visitors,
+    record_visitors
+)
+from market_cache import (
+    MARKET_TZ,
+    StaleWhileRevalidateCache,
+    last_settled_session,
+    next_settlement
+)
+from metrics import CONTENT_TYPE, REGISTRY, Gauge, MetricsMiddleware
+from middleware import CompressionMiddleware, SecurityHeadersMiddleware
+from pubsub import INTEREST_COUNT, SUBSCRIBER_COUNT, create_pubsub
+from rate_limit import RateLimiter, RateLimitMiddleware, RouteLimit
+from rollups import (
+    TIMESTAMP_FORMAT,
+    create_rollup_schema,
+    parse_bucket_time,
+    query_timeseries,
+    record_rollups,
+    utc_now
+)
+from series import (
+    BINARY_MEDIA_TYPE,
+    ENCODINGS,
+    MIN_POINTS,
+    downsample_columns,
+    downsample_series,
+    encode_binary,
+    encode_delta
+)
+from startup import StartupTimer
+from static_assets import AssetManifest, PrecompressedStaticFiles
+from worker_lock import WorkerLock
+from write_queue import WriteQueue
 
 # Load environment variables
 load_dotenv()
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(
+    level=LOG_LEVEL,
+    format='%(asctime)s %(levelname)s %(name)s %(message)s',
+)
 logger = logging.getLogger(__name__)
 
-# Get admin password from environment
+# Get admin password from environment (required; checked at startup)
 ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD')
+# Optional bearer token for scrapers of /metrics and the cache stats
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
 
-if not ADMIN_PASSWORD:
-    raise ValueError("Missing required environment variable: ADMIN_PASSWORD")
+# Boot time breakdown, checked against STARTUP_BUDGET_MS once the app is ready
+startup = StartupTimer(STARTUP_BUDGET_MS, started=_import_started)
 
-app = FastAPI(title=APP_NAME, description=APP_DESCRIPTION)
+# Shared market data client; its connection pool is opened in the lifespan
+alpaca_client = AlpacaClient(
+    ALPACA_BASE_URL,
+    ALPACA_API_KEY,
+    ALPACA_API_SECRET,
+    connect_timeout=ALPACA_CONNECT_TIMEOUT,
+    read_timeout=ALPACA_READ_TIMEOUT,
+    max_retries=ALPACA_MAX_RETRIES,
+    pool_size=ALPACA_POOL_SIZE,
+)
+
+# Local daily bar store so refreshes only fetch new bars
+bar_store = BarStore(Database(BAR_STORE_PATH, readers=2))
+
+# Paginated, chunked Alpaca fetches under one concurrency limit
+bar_fetcher = BarFetcher(
+    alpaca_client,
+    bar_store,
+    max_concurrency=BARS_MAX_CONCURRENCY,
+    batch_size=BARS_SYMBOLS_PER_REQUEST,
+)
+
+# Bootstrap projections, parallelised across processes for large path counts.
+# Created on first use so numpy/pandas are never imported at startup.
+monte_carlo = None
+
+def get_monte_carlo():
+    global monte_carlo
+    if monte_carlo is None:
+        from monte_carlo import MonteCarloEngine
+        monte_carlo = MonteCarloEngine(
+            workers=MONTE_CARLO_WORKERS,
+            chunk_paths=MONTE_CARLO_CHUNK_PATHS,
+            parallel_threshold=MONTE_CARLO_PARALLEL_THRESHOLD,
+            cache_size=MONTE_CARLO_CACHE_SIZE,
+            max_paths=MONTE_CARLO_MAX_PATHS,
+            max_concurrency=MONTE_CARLO_MAX_CONCURRENCY,
+        )
+    return monte_carlo
+
+def check_settings():
+    missing = missing_settings() + ([] if ADMIN_PASSWORD else ['ADMIN_PASSWORD'])
+    if missing:
+        raise RuntimeError(f"Missing required environment variables: {', '.join(missing)}. Please check your .env file.")
+
+async def timed(name: str, work):
+    with startup.phase(name):
+        return await work
+
+async def warm_up():
+    """Warm caches after startup, while requests are already being served"""
+    try:
+        with startup.phase("sp500_cache", warmup=True):
+            await warm_sp500_cache()
+        # Start bringing the bar store up to date now rather than on the first chart request
+        with startup.phase("sp500_revalidate", warmup=True):
+            await sp500_cache.get()
+        # The backtests need SPY's full history; fetch it before the first one is asked for
+        with startup.phase("spy_history", warmup=True):
+            await sync_spy_history()
+    except Exception as e:
+        logger.warning("warmup_failed error_type=%s error=%s", type(e).__name__, e)
+    else:
+        logger.info("warmup_complete %s", " ".join(f"{name}={ms}ms" for name, ms in startup.warmup.items()))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup.mark("server")
+    check_settings()
+    # Independent: the two database files. The Alpaca pool opens on first use, in warmup.
+    await asyncio.gather(
+        timed("init_db", asyncio.to_thread(init_db)),
+        timed("bar_store", asyncio.to_thread(bar_store.init)),
+    )
+    with startup.phase("services"):
+        await write_queue.start()
+        await worker_lock.start(start_background_jobs)
+        await pubsub.start()
+    startup.ready()
+    warmup_task = asyncio.create_task(warm_up())
+    try:
+        yield
+    finally:
+        warmup_task.cancel()
+        await pubsub.stop()
+        await broadcaster.close()
+        await write_queue.stop()
+        # Stop competing first, so no worker starts the jobs again while they shut down here
+        await worker_lock.stop()
+        await backup_scheduler.stop()
+        await interest_archive.stop()
+        worker_lock.release()
+        await alpaca_client.close()
+        db.close()
+        if monte_carlo is not None:
+            monte_carlo.shutdown()
+
+app = FastAPI(title=APP_NAME, description=APP_DESCRIPTION, lifespan=lifespan)
 
 # CORS configuration
 app.add_middleware(
@@ -53,51 +264,98 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Security headers middleware
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        response.headers["Content-Security-Policy"] = "upgrade-insecure-requests"
-        return response
+# Negotiated brotli/gzip; streaming responses are flushed chunk by chunk
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESSION_MINIMUM_SIZE,
+    gzip_level=COMPRESSION_GZIP_LEVEL,
+    brotli_quality=COMPRESSION_BROTLI_QUALITY,
+)
 
-app.add_middleware(SecurityHeadersMiddleware)
+# Write endpoints shed abusive clients and overload with a 429 before any DB work
+rate_limiter = RateLimiter(
+    {
+        ("POST", "/increment-interest"): RouteLimit(
+            INTEREST_RATE_PER_SECOND, INTEREST_BURST, INTEREST_MAX_CONCURRENCY
+        ),
+        ("POST", "/subscribe"): RouteLimit(
+            SUBSCRIBE_RATE_PER_SECOND, SUBSCRIBE_BURST, SUBSCRIBE_MAX_CONCURRENCY
+        ),
+    },
+    max_clients=RATE_LIMIT_MAX_CLIENTS,
+)
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
 
-# Mount static files with custom response class
-class SecureStaticFiles(StaticFiles):
-    async def file_response(self, scope, receive, send, file_path, stat_result):
-        response = await super().file_response(scope, receive, send, file_path, stat_result)
-        response.headers["Cache-Control"] = "public, max-age=31536000"
-        return response
+# Security headers middleware (pure ASGI, headers encoded once); wraps the
+# rate limiter so its 429s carry the headers too
+app.add_middleware(SecurityHeadersMiddleware)
 
-# Override url_for to always return HTTPS URLs for static files
-def url_for(request: Request, name: str, **path_params: Any) -> str:
-    url = request.url_for(name, **path_params)
-    if name.startswith("static"):
-        return url.replace("http://", "https://")
-    return url
+# Per-route request counts and latency for /metrics (outermost, so it times everything)
+app.add_middleware(MetricsMiddleware)
 
-# Mount static files with custom response class
-app.mount("/static", SecureStaticFiles(directory="static"), name="static")
+# Static files: fingerprinted build output is served precompressed and cached as immutable
+app.mount("/static", PrecompressedStaticFiles(directory="static"), name="static")
+assets = AssetManifest("static", "/static")
 
-# Templates with secure URLs
 templates = Jinja2Templates(directory="templates")
 
-# Override url_for to always use HTTPS
-def url_for(name: str, path: str, _scheme: str = "https") -> str:
-    return f"https://the-vault-production.up.railway.app{path}"
+# Template url_for: relative URLs to the fingerprinted names from build_assets.py
+def url_for(name: str, path: str, _scheme: Optional[str] = None) -> str:
+    return assets.url(path)
 
 templates.env.globals["url_for"] = url_for
 
+# Market data refresh settings
+MARKET_DATA_SETTLE_DELAY = timedelta(minutes=MARKET_DATA_SETTLE_MINUTES)
+
 # WebSocket connections
-active_connections: List[WebSocket] = []
+broadcaster = Broadcaster(
+    interval=BROADCAST_INTERVAL_MS / 1000,
+    queue_size=BROADCAST_QUEUE_SIZE,
+    send_timeout=BROADCAST_SEND_TIMEOUT,
+)
 
-# Database setup
-def init_db():
-    conn = sqlite3.connect('app.db')
+# Count updates reach every worker's broadcaster through the pub/sub backend
+pubsub = create_pubsub(PUBSUB_BACKEND, DATABASE_PATH, poll_interval=PUBSUB_POLL_INTERVAL_MS / 1000)
+
+def relay_count_event(event: dict):
+    if event["type"] == INTEREST_COUNT:
+        broadcaster.publish(event["count"])
+    # Any write may carry new rows for the admin dashboards
+    admin_events.notify(event)
+
+pubsub.subscribe(relay_count_event)
+
+# Shared connection pool (WAL mode, reader pool plus one writer)
+db = Database(
+    DATABASE_PATH,
+    readers=DB_READERS,
+    mmap_size=DB_MMAP_SIZE,
+    cache_size_kib=DB_CACHE_SIZE_KIB,
+)
+
+# Live deltas for admin dashboards, fed by the same pub/sub events
+admin_events = AdminEventHub(
+    db,
+    interval=ADMIN_EVENTS_INTERVAL_MS / 1000,
+    heartbeat=ADMIN_EVENTS_HEARTBEAT_SECONDS,
+)
+
+# Interest rows older than ARCHIVE_AFTER_DAYS move to Parquet; exports and backfills read both
+interest_archive = InterestArchive(
+    db,
+    root=ARCHIVE_DIR,
+    after_days=ARCHIVE_AFTER_DAYS,
+    interval=ARCHIVE_INTERVAL_SECONDS,
+    compression=ARCHIVE_COMPRESSION,
+    batch_size=EXPORT_BATCH_SIZE,
+)
+
+# Database setup. Bump SCHEMA_VERSION with every change to create_schema, so
+# files written by an older version run it (and its one-off backfills) once.
+SCHEMA_VERSION = 1
+
+def create_schema(conn, archive=None):
     c = conn.cursor()
     c.execute('''
         CREATE TABLE IF NOT EXISTS interest_data
@@ -111,38 +369,123 @@ def init_db():
          email TEXT UNIQUE,
          timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)
     ''')
-    conn.commit()
-    conn.close()
+    # Materialized row counts, maintained in the same transaction as each insert
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS counters
+        (name TEXT PRIMARY KEY,
+         value INTEGER NOT NULL)
+    ''')
+    # Seed once from the existing rows; this is the only full count ever taken
+    for table in ('interest_data', 'email_subscribers'):
+        c.execute('SELECT 1 FROM counters WHERE name = ?', (table,))
+        if c.fetchone() is None:
+            c.execute(f'INSERT INTO counters (name, value) SELECT ?, COUNT(*) FROM {table}', (table,))
+    c.execute("INSERT OR IGNORE INTO counters (name, value) VALUES ('data_version', 0)")
+    # Recent-row queries and since= filters walk these instead of scanning
+    c.execute('CREATE INDEX IF NOT EXISTS idx_interest_data_timestamp ON interest_data (timestamp)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_email_subscribers_timestamp ON email_subscribers (timestamp)')
+    create_rollup_schema(c, archive)
+    create_hll_schema(c, archive)
+    c.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
 
-def backup_db():
-    """Create a backup of the database with timestamp"""
-    try:
-        # Create backups directory if it doesn't exist
-        if not os.path.exists('backups'):
-            os.makedirs('backups')
-        
-        # Generate backup filename with timestamp
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_file = f'backups/app_backup_{timestamp}.db'
-        
-        # Copy the database file
-        shutil.copy2('app.db', backup_file)
-        print(f"Database backup created: {backup_file}")
-        
-        # Keep only the last 5 backups
-        backups = sorted([f for f in os.listdir('backups') if f.startswith('app_backup_')])
-        if len(backups) > 5:
-            for old_backup in backups[:-5]:
-                os.remove(os.path.join('backups', old_backup))
-                print(f"Removed old backup: {old_backup}")
-    except Exception as e:
-        print(f"Error creating backup: {str(e)}")
+def schema_version(conn) -> int:
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def init_db():
+    # Up-to-date files skip the DDL and the backfill checks, keeping boot off the tables
+    if db.run_read(schema_version) >= SCHEMA_VERSION:
+        return
+    db.run_write(create_schema, interest_archive)
+
+def read_counter(cursor, name: str) -> int:
+    """Read a materialized row count"""
+    row = cursor.execute('SELECT value FROM counters WHERE name = ?', (name,)).fetchone()
+    return row[0] if row else 0
+
+def bump_counter(cursor, name: str, amount: int = 1):
+    """Adjust a materialized row count inside the caller's transaction"""
+    cursor.execute('UPDATE counters SET value = value + ? WHERE name = ?', (amount, name))
+
+def write_batch(conn, batch):
+    c = conn.cursor()
+    results = [None] * len(batch)
+    # One timestamp per batch keeps the raw rows and their rollup buckets in step
+    now = utc_now()
+    timestamp = now.strftime(TIMESTAMP_FORMAT)
+    
+    # Interest clicks go in with a single executemany
+    interest = [i for i, request in enumerate(batch) if request.kind == 'interest']
+    if interest:
+        ips = [batch[i].args[0] for i in interest]
+        c.executemany(
+            'INSERT INTO interest_data (ip_address, timestamp) VALUES (?, ?)',
+            [(ip, timestamp) for ip in ips]
+        )
+        bump_counter(c, 'interest_data', len(interest))
+        record_rollups(c, 'interest', now, len(interest), ips)
+        record_visitors(c, now, ips)
+    
+    # Subscriptions can individually violate the unique email constraint
+    subscribed = 0
+    for i, request in enumerate(batch):
+        if request.kind != 'subscribe':
+            continue
+        try:
+            c.execute('INSERT INTO email_subscribers (email, timestamp) VALUES (?, ?)', (*request.args, timestamp))
+            subscribed += 1
+        except sqlite3.IntegrityError as e:
+            results[i] = e
+    if subscribed:
+        bump_counter(c, 'email_subscribers', subscribed)
+        record_rollups(c, 'subscribers', now, subscribed)
+    
+    # Readers cache against this; any committed batch invalidates them
+    bump_counter(c, 'data_version')
+    
+    # Every write in the batch reports the count after the batch
+    count = read_counter(c, 'interest_data')
+    for i in interest:
+        results[i] = count
+    subscribers = read_counter(c, 'email_subscribers')
+    for i, request in enumerate(batch):
+        if request.kind == 'subscribe' and results[i] is None:
+            results[i] = subscribers
+    return results
+
+def apply_write_batch(batch):
+    """Commit a batch of queued writes in one transaction (runs on the writer thread)"""
+    return db.run_write(write_batch, batch)
+
+# Group-commit queue for /increment-interest and /subscribe
+write_queue = WriteQueue(
+    apply_write_batch,
+    max_batch=WRITE_BATCH_SIZE,
+    max_delay=WRITE_BATCH_DELAY_MS / 1000,
+)
+
+def total_changes(conn) -> int:
+    # Rows ever added, by any worker; archiving moves rows but leaves these counters alone
+    return conn.execute(
+        "SELECT COALESCE(SUM(value), 0) FROM counters WHERE name IN ('interest_data', 'email_subscribers')"
+    ).fetchone()[0]
+
+# Online backups run in the background, off the request path
+backup_scheduler = BackupScheduler(
+    DATABASE_PATH,
+    backup_dir=BACKUP_DIR,
+    interval=BACKUP_INTERVAL_SECONDS,
+    change_threshold=BACKUP_CHANGE_THRESHOLD,
+    keep=BACKUP_KEEP,
+    compress=BACKUP_COMPRESS,
+    change_counter=lambda: db.run_read(total_changes),
+)
 
-# Initialize database
-init_db()
+# Backups and archiving run in one worker only; the others take over if it exits
+worker_lock = WorkerLock(f"{DATABASE_PATH}.jobs.lock")
 
-# Create initial backup
-backup_db()
+async def start_background_jobs():
+    await backup_scheduler.start()
+    await interest_archive.start()
 
 # Security
 async def verify_admin_password(password: str):
@@ -153,224 +496,339 @@ async def verify_admin_password(password: str):
         )
     return True
 
-@app.get("/export-data")
-async def export_data(password: str, verified: bool = Depends(verify_admin_password)):
-    try:
-        conn = sqlite3.connect('app.db')
-        c = conn.cursor()
-        
-        # Get all interest data
-        c.execute('''
-            SELECT ip_address, timestamp 
-            FROM interest_data 
-            ORDER BY timestamp DESC
-        ''')
-        interest_data = c.fetchall()
-        
-        # Get all email subscribers
-        c.execute('''
-            SELECT email, timestamp 
-            FROM email_subscribers 
-            ORDER BY timestamp DESC
-        ''')
-        email_data = c.fetchall()
-        
-        # Get summary statistics
-        c.execute('SELECT COUNT(*) FROM interest_data')
-        total_interest = c.fetchone()[0]
-        
-        c.execute('SELECT COUNT(DISTINCT ip_address) FROM interest_data')
-        unique_visitors = c.fetchone()[0]
-        
-        c.execute('SELECT COUNT(*) FROM email_subscribers')
-        total_subscribers = c.fetchone()[0]
-        
-        conn.close()
-        
-        return {
-            "summary": {
-                "total_interest": total_interest,
-                "unique_visitors": unique_visitors,
-                "total_subscribers": total_subscribers
-            },
-            "interest_data": [
-                {
-                    "ip_address": row[0],
-                    "timestamp": row[1]
-                } for row in interest_data
-            ],
-            "email_data": [
-                {
-                    "email": row[0],
-                    "timestamp": row[1]
-                } for row in email_data
-            ]
-        }
-    except Exception as e:
+async def verify_stats_access(request: Request, password: Optional[str] = None):
+    # The admin password, or `Authorization: Bearer <METRICS_TOKEN>` for a scraper
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if METRICS_TOKEN and scheme.lower() == "bearer" and secrets.compare_digest(token.strip(), METRICS_TOKEN):
+        return True
+    if password is not None and password == ADMIN_PASSWORD:
+        return True
+    raise HTTPException(
+        status_code=401,
+        detail="Invalid password or token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+# Each export download holds a SQLite connection until the client has read it all
+export_streams = ExportStreams(EXPORT_MAX_STREAMS)
+
+def claim_export_stream():
+    """Reserve an export slot, returning its release callback, or refuse with a 503"""
+    if not export_streams.acquire():
         raise HTTPException(
-            status_code=500,
-            detail=f"Error exporting data: {str(e)}"
+            status_code=503,
+            detail="Too many exports in progress, please retry shortly",
+            headers={"Retry-After": "5"},
         )
+    return export_streams.release
 
-@app.get("/sp500-data")
-async def get_sp500_data():
+def export_batches(export_table, since: Optional[str] = None, after_id: Optional[int] = None,
+                   limit: Optional[int] = None):
+    """Row batches for one export section, reading through to the archive where there is one"""
+    batches = db.iter_batches(*select_rows(export_table, since, after_id, limit), EXPORT_BATCH_SIZE)
+    if export_table.name != interest_archive.table:
+        return batches
+    return with_archive(batches, interest_archive, since, after_id, limit)
+
+@app.get("/export-data")
+async def export_data(
+    password: str,
+    format: str = "json",
+    table: Optional[str] = None,
+    since: Optional[str] = None,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    gzip: bool = False,
+    exact: bool = False,
+    verified: bool = Depends(verify_admin_password),
+):
+    # Validate the export options before anything is streamed
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'ndjson'")
+    if table is not None and table not in EXPORT_TABLES:
+        raise HTTPException(status_code=400, detail=f"table must be one of: {', '.join(EXPORT_TABLES)}")
     try:
-        print("\n=== Starting S&P 500 Data Fetch ===")
-        # Calculate date range (using historical data)
-        end_date = datetime.now() - timedelta(days=1)  # Yesterday
-        start_date = end_date - timedelta(days=365)  # One year ago
-        
-        print(f"Date Range:")
-        print(f"Start: {start_date}")
-        print(f"End: {end_date}")
-        
-        # Format dates for Alpaca API (ISO 8601 format)
-        start_str = start_date.strftime('%Y-%m-%d')
-        end_str = end_date.strftime('%Y-%m-%d')
-        
-        # Alpaca API endpoint for historical data
-        url = f"{ALPACA_BASE_URL}/stocks/bars?symbols=SPY&start={start_str}&end={end_str}&timeframe=1Day&limit=1000"
-        headers = {
-            'APCA-API-KEY-ID': ALPACA_API_KEY,
-            'APCA-API-SECRET-KEY': ALPACA_API_SECRET
-        }
-        
-        print("\nAPI Request Details:")
-        print(f"URL: {url}")
-        print(f"Headers: {json.dumps(headers, indent=2)}")
-        
-        # Add retry logic
-        max_retries = 3
-        data = None
-        for attempt in range(max_retries):
-            try:
-                print(f"\nAttempt {attempt + 1} of {max_retries}")
-                print("Making request to Alpaca API...")
-                
-                response = requests.get(url, headers=headers)
-                print(f"Response Status Code: {response.status_code}")
-                print(f"Response Headers: {json.dumps(dict(response.headers), indent=2)}")
-                print(f"Response Content: {response.text[:500]}")  # Print first 500 chars of response
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    print("\nSuccessfully received data:")
-                    print(f"Data keys: {list(data.keys())}")
-                    if data.get('bars') and data['bars'].get('SPY'):
-                        print("Found SPY data in response")
-                        break
-                    else:
-                        print("No SPY data found in response")
-                elif response.status_code == 401:
-                    print("\nAuthentication failed. Please check API credentials.")
-                    print("Response content:", response.text)
-                    break
-                elif response.status_code == 403:
-                    print("\nAccess forbidden. Please check API permissions.")
-                    print("Response content:", response.text)
-                    break
-                elif response.status_code == 404:
-                    print("\nEndpoint not found. Please check API URL.")
-                    print("Response content:", response.text)
-                    break
-                else:
-                    print(f"\nUnexpected status code: {response.status_code}")
-                    print("Response content:", response.text)
-                
-                print(f"\nAttempt {attempt + 1} failed, retrying...")
-                time.sleep(1)
-            except Exception as e:
-                print(f"\nException during attempt {attempt + 1}:")
-                print(f"Error type: {type(e).__name__}")
-                print(f"Error message: {str(e)}")
-                if attempt == max_retries - 1:
-                    raise
-                time.sleep(1)
-        
-        if not data or not data.get('bars') or not data['bars'].get('SPY'):
-            print("\nNo valid data available for SPY")
+        since = parse_since(since)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Keyset pagination walks a single table in id order
+    paged = after_id is not None or limit is not None
+    if paged:
+        if table is None:
+            raise HTTPException(status_code=400, detail="table is required with after_id/limit")
+        limit = min(limit or EXPORT_MAX_PAGE_SIZE, EXPORT_MAX_PAGE_SIZE)
+        if limit < 1:
+            raise HTTPException(status_code=400, detail="limit must be positive")
+        after_id = after_id or 0
+    
+    tables = [EXPORT_TABLES[table]] if table else list(EXPORT_TABLES.values())
+    sections = [
+        (export_table, export_batches(export_table, since, after_id, limit))
+        for export_table in tables
+    ]
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    
+    if format == "ndjson":
+        chunks = ndjson_export(sections, limit if paged else None)
+        return stream_export(
+            chunks, "application/x-ndjson", f"export_{timestamp}.ndjson" if gzip else None, gzip,
+            on_close=claim_export_stream(),
+        )
+    
+    if paged:
+        chunks = json_page(tables[0], sections[0][1], limit)
+    else:
+        def summary_query(conn):
+            c = conn.cursor()
+            # Unique visitors come from the all-time sketch unless an exact audit is asked for
+            if exact:
+                unique_visitors = count_distinct(c, archive=interest_archive)
+            else:
+                unique_visitors = estimate_visitors(conn, utc_now().date())["all_time"]
             return {
-                "dates": [],
-                "prices": []
+                "total_interest": read_counter(c, 'interest_data'),
+                "unique_visitors": unique_visitors,
+                "total_subscribers": read_counter(c, 'email_subscribers'),
             }
-            
-        # Format data for Chart.js
-        bars = data['bars']['SPY']
-        print(f"\nProcessing {len(bars)} data points")
-        dates = [bar['t'] for bar in bars]
-        prices = [bar['c'] for bar in bars]
-        
-        print(f"Formatted {len(dates)} dates and {len(prices)} prices")
-        print("First few data points:")
-        for i in range(min(3, len(dates))):
-            print(f"Date: {dates[i]}, Price: {prices[i]}")
         
-        print("\n=== S&P 500 Data Fetch Complete ===\n")
-        return {
-            "dates": dates,
-            "prices": prices
-        }
+        summary = await db.read(summary_query)
+        chunks = json_export(summary, sections)
+    return stream_export(
+        chunks, "application/json", f"export_{timestamp}.json" if gzip else None, gzip,
+        on_close=claim_export_stream(),
+    )
+
+def sp500_window(now: datetime):
+    """Return the (start, end) dates charted on the landing page"""
+    # Up to the most recent settled trading session, one year back
+    end_date = last_settled_session(now, MARKET_DATA_SETTLE_DELAY).date()
+    return end_date - timedelta(days=365), end_date
+
+async def load_sp500_from_store():
+    """Read the charted SPY window from the local bar store"""
+    start_date, end_date = sp500_window(datetime.now(MARKET_TZ))
+    rows = await asyncio.to_thread(bar_store.closes, "SPY", start_date, end_date)
+    return {
+        "dates": [timestamp for timestamp, _ in rows],
+        "prices": [close for _, close in rows]
+    }
+
+async def fetch_sp500_data():
+    """Bring the SPY bar store up to date and return the charted window"""
+    start_date, end_date = sp500_window(datetime.now(MARKET_TZ))
+    
+    # Only dates the store has not fetched yet are requested from Alpaca
+    await bar_fetcher.sync(["SPY"], start_date, end_date)
+    
+    data = await load_sp500_from_store()
+    if not data["prices"]:
+        # Raise instead of returning empty data so the failure is never cached
+        raise ValueError("No valid data available for SPY")
+    return data
+
+async def warm_sp500_cache():
+    """Serve whatever is on disk immediately, revalidating it if it is behind"""
+    data = await load_sp500_from_store()
+    if not data["prices"]:
+        return
+    now = datetime.now(MARKET_TZ)
+    _, end_date = sp500_window(now)
+    last_date = await asyncio.to_thread(bar_store.last_date, "SPY")
+    expires_at = next_settlement(now, MARKET_DATA_SETTLE_DELAY).timestamp() if last_date >= end_date else 0.0
+    sp500_cache.prime(data, expires_at)
+
+# Daily bars only change once per trading day, so cache them until the next
+# session settles and revalidate in the background after that
+sp500_cache = StaleWhileRevalidateCache(
+    fetch_sp500_data,
+    expiry=lambda now: next_settlement(now, MARKET_DATA_SETTLE_DELAY),
+)
+
+def encode_sp500(data: dict, max_points: Optional[int], encoding: str):
+    dates, prices = data["dates"], data["prices"]
+    if max_points:
+        dates, prices = downsample_series(dates, prices, max_points)
+    if encoding == "delta":
+        return encode_delta(dates, prices)
+    if encoding == "binary":
+        return encode_binary(dates, prices)
+    return {"dates": dates, "prices": prices}
+
+# Downsampled/encoded views of the cached window, dropped whenever it is refreshed
+sp500_variants = {"data": None, "variants": {}}
+
+def sp500_variant(data: dict, max_points: Optional[int], encoding: str):
+    if sp500_variants["data"] is not data:
+        sp500_variants["data"] = data
+        sp500_variants["variants"] = {}
+    variants = sp500_variants["variants"]
+    key = (max_points, encoding)
+    if key not in variants:
+        # max_points comes from the client, so keep the set of views small
+        if len(variants) >= 32:
+            variants.clear()
+        variants[key] = encode_sp500(data, max_points, encoding)
+    return variants[key]
+
+@app.get("/sp500-data")
+async def get_sp500_data(max_points: Optional[int] = None, encoding: str = "json"):
+    if encoding not in ENCODINGS:
+        raise HTTPException(status_code=400, detail=f"encoding must be one of: {', '.join(ENCODINGS)}")
+    if max_points is not None and max_points < MIN_POINTS:
+        raise HTTPException(status_code=400, detail=f"max_points must be at least {MIN_POINTS}")
+    
+    try:
+        body = sp500_variant(await sp500_cache.get(), max_points, encoding)
     except Exception as e:
-        print(f"\nError in get_sp500_data:")
-        print(f"Error type: {type(e).__name__}")
-        print(f"Error message: {str(e)}")
-        return {
-            "dates": [],
-            "prices": []
-        }
+        logger.warning("sp500_data_failed error_type=%s error=%s", type(e).__name__, e)
+        body = encode_sp500({"dates": [], "prices": []}, None, encoding)
+    if encoding == "binary":
+        return Response(content=body, media_type=BINARY_MEDIA_TYPE)
+    return body
+
+@app.get("/bars")
+async def get_bars(
+    symbols: str = "SPY",
+    timeframe: str = "1Day",
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to"),
+    fields: str = "close",
+    max_points: Optional[int] = None,
+):
+    if max_points is not None and max_points < MIN_POINTS:
+        raise HTTPException(status_code=400, detail=f"max_points must be at least {MIN_POINTS}")
+    latest = last_settled_session(datetime.now(MARKET_TZ), MARKET_DATA_SETTLE_DELAY).date()
+    try:
+        symbol_list = parse_symbols(symbols, BARS_MAX_SYMBOLS)
+        field_list = parse_fields(fields)
+        start_date, end_date = bars_window(timeframe, start, end, latest)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        if timeframe == "1Day":
+            # Daily bars are served from the store once fetched
+            await bar_fetcher.sync(symbol_list, start_date, end_date)
+            bars = await asyncio.to_thread(bar_store.bars, symbol_list, start_date, end_date)
+        else:
+            bars = await bar_fetcher.fetch(symbol_list, start_date, end_date, timeframe)
+    except AlpacaError as e:
+        logger.warning("bars_failed error_type=%s error=%s", type(e).__name__, e)
+        raise HTTPException(status_code=502, detail="Market data is temporarily unavailable")
+    
+    aligned = align_bars(bars, field_list)
+    if max_points:
+        # Shape is judged on each symbol's first requested field; all fields keep the same rows
+        kept = downsample_columns([columns[field_list[0]] for columns in aligned["series"].values()], max_points)
+        aligned["timestamps"] = [aligned["timestamps"][i] for i in kept]
+        for columns in aligned["series"].values():
+            for field in field_list:
+                columns[field] = [columns[field][i] for i in kept]
+    
+    return {
+        "symbols": symbol_list,
+        "timeframe": timeframe,
+        "from": start_date.isoformat(),
+        "to": end_date.isoformat(),
+        **aligned,
+    }
+
+@app.get("/sp500-data/cache-stats")
+async def get_sp500_cache_stats(verified: bool = Depends(verify_stats_access)):
+    return sp500_cache.stats()
+
+# Monthly SPY closes for the backtest, rebuilt only when bars are added at either end
+spy_monthly_closes = {"span": None, "series": None}
+spy_history_lock = asyncio.Lock()
+
+async def sync_spy_history():
+    """Bring SPY's full daily history into the store, not just the chart's year"""
+    _, end_date = sp500_window(datetime.now(MARKET_TZ))
+    # One sync at a time; later callers find the range covered and fetch nothing
+    async with spy_history_lock:
+        try:
+            await bar_fetcher.sync(["SPY"], date.fromisoformat(BACKTEST_HISTORY_START), end_date)
+        except AlpacaError as e:
+            # Whatever is stored still serves; the missing range is retried next time
+            logger.warning("spy_history_sync_failed error_type=%s error=%s", type(e).__name__, e)
+
+async def load_spy_monthly_closes():
+    await sync_spy_history()
+    span = await asyncio.to_thread(bar_store.span, "SPY")
+    if spy_monthly_closes["series"] is None or spy_monthly_closes["span"] != span:
+        rows = await asyncio.to_thread(bar_store.closes, "SPY")
+        from backtest import monthly_closes
+        spy_monthly_closes["series"] = monthly_closes(rows)
+        spy_monthly_closes["span"] = span
+    return spy_monthly_closes["series"]
+
+@app.get("/sip-backtest")
+async def get_sip_backtest(monthly: str = "50", years: str = "1..40"):
+    from backtest import InsufficientHistory, parse_grid, sip_backtest
+    try:
+        monthly_grid = parse_grid(monthly, float)
+        years_grid = parse_grid(years, int)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    series = await load_spy_monthly_closes()
+    try:
+        return sip_backtest(series, monthly_grid, years_grid)
+    except InsufficientHistory as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/sip-montecarlo")
+async def get_sip_montecarlo(monthly: float = 50, years: int = 40, paths: int = 10_000):
+    # No client-chosen seed: every distinct seed would be a guaranteed cache miss
+    from backtest import InsufficientHistory
+    from monte_carlo import monthly_returns
+    series = await load_spy_monthly_closes()
+    try:
+        return await get_monte_carlo().project(
+            monthly_returns(series),
+            spy_monthly_closes["span"],
+            monthly,
+            years,
+            paths,
+        )
+    except InsufficientHistory as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.websocket("/ws/interest")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    active_connections.append(websocket)
     try:
-        # Send initial count
-        conn = sqlite3.connect('app.db')
-        c = conn.cursor()
-        c.execute('SELECT COUNT(*) FROM interest_data')
-        count = c.fetchone()[0]
-        conn.close()
-        await websocket.send_json({"count": count})
+        # Initial count goes out through the socket's own send queue
+        count = await db.read(read_counter, 'interest_data')
+        broadcaster.connect(websocket, count)
         
         while True:
             # Keep connection alive
             await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
     except Exception as e:
-        print(f"WebSocket error: {str(e)}")
+        logger.warning("websocket_error error=%s", e)
     finally:
-        active_connections.remove(websocket)
+        broadcaster.disconnect(websocket)
 
-async def broadcast_interest_count():
-    conn = sqlite3.connect('app.db')
-    c = conn.cursor()
-    c.execute('SELECT COUNT(*) FROM interest_data')
-    count = c.fetchone()[0]
-    conn.close()
-    
-    for connection in active_connections:
-        try:
-            await connection.send_json({"count": count})
-        except Exception as e:
-            print(f"Error broadcasting to WebSocket: {str(e)}")
+def broadcast_interest_count(count: int):
+    # Coalesced per worker; other workers pick the update up through pub/sub
+    pubsub.publish({"type": INTEREST_COUNT, "count": count})
 
 @app.post("/increment-interest")
 async def increment_interest(request: Request):
-    client_ip = request.client.host
-    conn = sqlite3.connect('app.db')
-    c = conn.cursor()
-    c.execute('INSERT INTO interest_data (ip_address) VALUES (?)', (client_ip,))
-    conn.commit()
-    
-    # Get the updated count
-    c.execute('SELECT COUNT(*) FROM interest_data')
-    count = c.fetchone()[0]
-    conn.close()
-    
-    # Backup after each interest increment
-    backup_db()
+    client_ip = request.client.host if request.client else None
+    # Queued and committed together with any other writes in flight
+    count = await write_queue.submit('interest', client_ip)
     
     # Broadcast new count to all connected clients
-    await broadcast_interest_count()
+    broadcast_interest_count(count)
     
     return {"count": count}
 
@@ -382,14 +840,8 @@ async def subscribe_email(request: Request):
         if not email:
             raise HTTPException(status_code=400, detail="Email is required")
             
-        conn = sqlite3.connect('app.db')
-        c = conn.cursor()
-        c.execute('INSERT INTO email_subscribers (email) VALUES (?)', (email,))
-        conn.commit()
-        conn.close()
-        
-        # Backup after each subscription
-        backup_db()
+        subscribers = await write_queue.submit('subscribe', email)
+        pubsub.publish({"type": SUBSCRIBER_COUNT, "count": subscribers})
         
         return {"message": "Successfully subscribed!"}
     except sqlite3.IntegrityError:
@@ -397,37 +849,38 @@ async def subscribe_email(request: Request):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Last /admin/stats body and the data version it was built at
+admin_stats_cache = {"version": None, "body": None}
+
 @app.get("/admin/stats")
 async def get_admin_stats(request: Request):
     try:
         # Get the password from query parameters
         password = request.query_params.get('password')
-        print(f"Received password: {password}")  # Debug print
         
         # If no password provided or password is incorrect, return unauthorized
         if not password or password != ADMIN_PASSWORD:
-            print("Password verification failed")  # Debug print
+            logger.debug("admin_auth_failed route=/admin/stats")
             raise HTTPException(status_code=401, detail="Unauthorized")
         
-        print("Password verified successfully")  # Debug print
+        # Unchanged data since the client's copy: answer without touching the tables
+        version = await db.read(read_counter, 'data_version')
+        etag = f'"stats-{version}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if request.headers.get('if-none-match') == etag:
+            return Response(status_code=304, headers=headers)
+        if admin_stats_cache["version"] == version:
+            return JSONResponse(admin_stats_cache["body"], headers=headers)
         
         # Get stats from database
-        with sqlite3.connect('app.db') as conn:
+        def query(conn):
             cursor = conn.cursor()
             
             # Get total interest (count of interest entries)
-            cursor.execute("""
-                SELECT COUNT(*) 
-                FROM interest_data
-            """)
-            total_interest = cursor.fetchone()[0]
+            total_interest = read_counter(cursor, 'interest_data')
             
             # Get total subscribers
-            cursor.execute("""
-                SELECT COUNT(*) 
-                FROM email_subscribers
-            """)
-            total_subscribers = cursor.fetchone()[0]
+            total_subscribers = read_counter(cursor, 'email_subscribers')
             
             # Get recent interest (last 5)
             cursor.execute("""
@@ -459,74 +912,120 @@ async def get_admin_stats(request: Request):
                 "recent_interest": recent_interest,
                 "recent_subscribers": recent_subscribers
             }
+        
+        body = await db.read(query)
+        admin_stats_cache.update(version=version, body=body)
+        return JSONResponse(body, headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error in admin stats: {str(e)}")
+        logger.exception("admin_stats_failed")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/admin/events")
+async def admin_event_stream(
+    request: Request,
+    password: str,
+    last_event_id: Optional[str] = None,
+    verified: bool = Depends(verify_admin_password),
+):
+    # EventSource sends Last-Event-ID itself when it reconnects
+    resume_from = request.headers.get('last-event-id') or last_event_id
+    return StreamingResponse(
+        admin_events.stream(resume_from),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Gauges read at scrape time
+REGISTRY.register(Gauge("websocket_connections", "Open interest-count WebSockets", lambda: len(broadcaster)))
+REGISTRY.register(Gauge("admin_event_streams", "Open admin SSE streams", lambda: admin_events.stats()["clients"]))
+REGISTRY.register(Gauge("write_queue_pending", "Writes waiting for the next group commit", lambda: write_queue.stats()["pending"]))
+
+@app.get("/metrics")
+async def get_metrics(verified: bool = Depends(verify_stats_access)):
+    # Prometheus text exposition; route labels only, no request data
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.get("/admin/db-stats")
+async def get_db_stats(password: str, verified: bool = Depends(verify_admin_password)):
+    return {
+        "app": db.stats(),
+        "bar_store": bar_store.db.stats(),
+        "bar_fetcher": bar_fetcher.stats(),
+        "write_queue": write_queue.stats(),
+        "pubsub": pubsub.stats(),
+        "admin_events": admin_events.stats(),
+        "startup": startup.stats(),
+        "rate_limits": rate_limiter.stats(),
+        "archive": interest_archive.stats(),
+        "exports": export_streams.stats(),
+        "background_jobs": worker_lock.stats(),
+    }
+
+@app.get("/admin/timeseries")
+async def get_timeseries(
+    password: str,
+    bucket: str = "hour",
+    metric: str = "interest",
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to"),
+    verified: bool = Depends(verify_admin_password),
+):
+    # Served from the rollup tables; the raw tables are never scanned
+    try:
+        points = await db.read(query_timeseries, metric, bucket, parse_bucket_time(start), parse_bucket_time(end))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"metric": metric, "bucket": bucket, "points": points}
+
+@app.get("/admin/unique-visitors")
+async def get_unique_visitors(password: str, exact: bool = False, verified: bool = Depends(verify_admin_password)):
+    # HyperLogLog estimates by default; exact=true scans interest_data and its archive for audits
+    today = utc_now().date()
+    if exact:
+        counts = await db.read(count_visitors, today, interest_archive)
+    else:
+        counts = await db.read(estimate_visitors, today)
+    return {
+        **counts,
+        "exact": exact,
+        "standard_error": 0.0 if exact else round(STANDARD_ERROR, 4),
+    }
+
 @app.get("/admin/download-csv")
 async def download_csv(request: Request):
     try:
         # Get the password from query parameters
         password = request.query_params.get('password')
-        print(f"\n=== Download CSV Request Debug ===")
-        print(f"Received password: {password}")
-        print(f"Expected password: {ADMIN_PASSWORD}")
         
         # If no password provided or password is incorrect, return unauthorized
         if not password or password != ADMIN_PASSWORD:
-            print("Password verification failed")
+            logger.debug("admin_auth_failed route=/admin/download-csv")
             raise HTTPException(status_code=401, detail="Unauthorized")
         
-        print("Password verified successfully")
+        try:
+            since = parse_since(request.query_params.get('since'))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        compress = request.query_params.get('gzip', '').lower() in ('1', 'true', 'yes')
         
-        # Get data from database
-        with sqlite3.connect('app.db') as conn:
-            cursor = conn.cursor()
-            
-            # Get interest data
-            cursor.execute("""
-                SELECT ip_address, timestamp 
-                FROM interest_data 
-                ORDER BY timestamp DESC
-            """)
-            interest_data = cursor.fetchall()
-            
-            # Get subscriber data
-            cursor.execute("""
-                SELECT email, timestamp 
-                FROM email_subscribers 
-                ORDER BY timestamp DESC
-            """)
-            subscriber_data = cursor.fetchall()
-            
-            # Create CSV content
-            csv_content = []
-            
-            # Add interest data
-            csv_content.append("Interest Data")
-            csv_content.append("IP Address,Timestamp")
-            for ip, timestamp in interest_data:
-                csv_content.append(f"{ip},{timestamp}")
-            
-            # Add subscriber data
-            csv_content.append("\nSubscriber Data")
-            csv_content.append("Email,Timestamp")
-            for email, timestamp in subscriber_data:
-                csv_content.append(f"{email},{timestamp}")
-            
-            # Join all lines
-            csv_text = "\n".join(csv_content)
-            
-            # Create response with CSV content
-            return Response(
-                content=csv_text,
-                media_type="text/csv",
-                headers={
-                    "Content-Disposition": f'attachment; filename="admin_stats_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-                }
-            )
+        # Rows are streamed in batches straight from the cursor and the archive
+        sections = [
+            (export_table, export_batches(export_table, since))
+            for export_table in EXPORT_TABLES.values()
+        ]
+        return stream_export(
+            csv_export(sections),
+            "text/csv",
+            f'admin_stats_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv',
+            compress,
+            on_close=claim_export_stream(),
+        )
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error in download CSV: {str(e)}")
+        logger.exception("download_csv_failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/admin")
@@ -534,26 +1033,22 @@ async def admin_page(request: Request):
     try:
         # Get the password from query parameters
         password = request.query_params.get('password')
-        print(f"\n=== Admin Page Request Debug ===")
-        print(f"Received password: {password}")
-        print(f"Expected password: {ADMIN_PASSWORD}")
         
         # If no password provided or password is incorrect, return login page
         if not password or password != ADMIN_PASSWORD:
-            print("Password verification failed")
+            logger.debug("admin_auth_failed route=/admin")
             return templates.TemplateResponse(
                 "admin_login.html",
                 {"request": request}
             )
         
-        print("Password verified successfully")
         # If password is correct, show admin page
         return templates.TemplateResponse(
             "admin_page.html",
             {"request": request}
         )
     except Exception as e:
-        print(f"Error in admin page: {str(e)}")
+        logger.exception("admin_page_failed")
         return templates.TemplateResponse(
             "admin_login.html",
             {"request": request}
@@ -565,29 +1060,23 @@ async def admin_login(request: Request):
         # Check if password was submitted
         form_data = await request.form()
         password = form_data.get("password", "")
-        print(f"Received password: {password}")  # Debug print
         
         if password == ADMIN_PASSWORD:
-            print("Password verified successfully")  # Debug print
             # Password is correct, show admin page
             return templates.TemplateResponse("admin_page.html", {"request": request})
         else:
-            print("Password verification failed")  # Debug print
+            logger.debug("admin_auth_failed route=/admin method=POST")
             # Show login form with error if incorrect password
             return templates.TemplateResponse("admin_login.html", {"request": request, "error": "Incorrect password"})
             
     except Exception as e:
-        print(f"Error in admin_login: {str(e)}")
+        logger.exception("admin_login_failed")
         return templates.TemplateResponse("admin_login.html", {"request": request, "error": "An error occurred"})
 
 @app.get("/", response_class=HTMLResponse)
 async def landing_page(request: Request):
     try:
-        conn = sqlite3.connect('app.db')
-        c = conn.cursor()
-        c.execute('SELECT COUNT(*) FROM interest_data')
-        interest_count = c.fetchone()[0]
-        conn.close()
+        interest_count = await db.read(read_counter, 'interest_data')
         
         return templates.TemplateResponse(
             "landing_page.html",
@@ -611,6 +1100,9 @@ async def landing_page(request: Request):
             }
         )
 
+# Everything above ran at import; the lifespan times the rest of the boot
+startup.mark("import")
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000) 
@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, NamedTuple, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ["id", "ip_address", "timestamp"]
+
+# PRAGMA auto_vacuum value of files created with auto_vacuum = INCREMENTAL
+INCREMENTAL_VACUUM = 2
+
+
+class Partition(NamedTuple):
+    day: str
+    first_id: int
+    last_id: int
+    path: str
+
+
+class InterestArchive:
+    """Cold storage for interest_data: date-partitioned, compressed Parquet.
+
+    Whole UTC days older than `after_days` are written to
+    <root>/interest_data/date=YYYY-MM-DD/part-<first id>-<last id>.parquet
+    and then deleted from SQLite, one day per transaction. A crash between
+    the two steps rewrites the same file on the next run, so rows are never
+    lost or duplicated. Counters, rollups and sketches were maintained at
+    insert time and are left alone; exports, exact visitor counts and the
+    one-off backfills read the archive alongside the hot table.
+
+    Cutting at midnight keeps every rollup bucket entirely hot or entirely
+    archived. pandas is imported only when the archive is read or written.
+    """
+
+    table = "interest_data"
+
+    def __init__(self, db, root: str = "archive", after_days: int = 90, interval: float = 3600,
+                 compression: str = "zstd", batch_size: int = 1000, vacuum_step: int = 1024,
+                 vacuum_pause: float = 0.05):
+        self.db = db
+        self.root = os.path.join(root, self.table)
+        self.after_days = after_days
+        self.interval = interval
+        self.compression = compression
+        self.batch_size = batch_size
+        self.vacuum_step = vacuum_step
+        self.vacuum_pause = vacuum_pause
+        self.rows_archived = 0
+        self.pages_reclaimed = 0
+        self.runs = 0
+        self.last_run_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._warned_full_vacuum = False
+
+    def partitions(self, since: Optional[str] = None) -> List[Partition]:
+        """Archived files in id order, skipping days before `since`"""
+        if not os.path.isdir(self.root):
+            return []
+        found = []
+        for directory in os.listdir(self.root):
+            if not directory.startswith("date="):
+                continue
+            day = directory[len("date="):]
+            if since is not None and day < since[:10]:
+                continue
+            for name in os.listdir(os.path.join(self.root, directory)):
+                if name.startswith("part-") and name.endswith(".parquet"):
+                    first_id, last_id = name[len("part-"):-len(".parquet")].split("-")
+                    found.append(Partition(day, int(first_id), int(last_id),
+                                           os.path.join(self.root, directory, name)))
+        found.sort(key=lambda partition: partition.first_id)
+        return found
+
+    def _frame(self, path: str, since: Optional[str], columns: List[str] = COLUMNS):
+        import pandas as pd
+
+        frame = pd.read_parquet(path, columns=columns)
+        if since is not None:
+            frame = frame[frame["timestamp"] >= since]
+        return frame
+
+    def iter_batches(self, since: Optional[str] = None, after_id: Optional[int] = None,
+                     before_id: Optional[int] = None, descending: bool = False) -> Iterator[List[tuple]]:
+        """Archived (id, ip_address, timestamp) rows in id order, `batch_size` at a time"""
+        partitions = [
+            partition for partition in self.partitions(since)
+            if (after_id is None or partition.last_id > after_id)
+            and (before_id is None or partition.first_id < before_id)
+        ]
+        if descending:
+            partitions.reverse()
+        for partition in partitions:
+            frame = self._frame(partition.path, since)
+            if after_id is not None:
+                frame = frame[frame["id"] > after_id]
+            if before_id is not None:
+                frame = frame[frame["id"] < before_id]
+            frame = frame.sort_values("id", ascending=not descending)
+            # tolist() gives plain Python values, which the JSON/CSV writers expect
+            rows = list(zip(frame["id"].tolist(), frame["ip_address"].tolist(), frame["timestamp"].tolist()))
+            for i in range(0, len(rows), self.batch_size):
+                yield rows[i:i + self.batch_size]
+
+    def iter_rows(self) -> Iterator[tuple]:
+        for rows in self.iter_batches():
+            yield from rows
+
+    def distinct_ips(self, since: Optional[str] = None) -> Set[str]:
+        ips: Set[str] = set()
+        for partition in self.partitions(since):
+            frame = self._frame(partition.path, since, ["ip_address", "timestamp"])
+            ips.update(frame["ip_address"].dropna().unique().tolist())
+        return ips
+
+    def bucket_counts(self, fmt: str) -> Iterator[Tuple[str, int, int]]:
+        """(bucket start, rows, distinct IPs) per strftime bucket, for rollup backfills.
+
+        Buckets no longer than a day never span two partitions.
+        """
+        partitions = self.partitions()
+        if not partitions:
+            return
+        import pandas as pd
+
+        for partition in partitions:
+            frame = self._frame(partition.path, None, ["ip_address", "timestamp"])
+            starts = pd.to_datetime(frame["timestamp"]).dt.strftime(fmt)
+            grouped = frame.groupby(starts)["ip_address"].agg(["size", "nunique"])
+            for start, count, unique in grouped.itertuples():
+                yield start, int(count), int(unique)
+
+    def cutoff(self, now: Optional[datetime] = None) -> str:
+        """UTC midnight before which rows are archived"""
+        today = (now or datetime.utcnow()).date()
+        return f"{today - timedelta(days=self.after_days):%Y-%m-%d} 00:00:00"
+
+    def archive_now(self, now: Optional[datetime] = None) -> int:
+        """Move every whole day older than the cutoff into Parquet (blocking)"""
+        days = self.db.run_read(lambda conn: conn.execute(
+            f'SELECT date(timestamp), MAX(id) FROM {self.table} WHERE timestamp < ? GROUP BY 1 ORDER BY 1',
+            (self.cutoff(now),)
+        ).fetchall())
+        if days:
+            import pandas as pd
+
+        archived = 0
+        for day, max_id in days:
+            start = f"{day} 00:00:00"
+            end = f"{date.fromisoformat(day) + timedelta(days=1)} 00:00:00"
+            params = (start, end, max_id)
+            rows = [row for batch in self.db.iter_batches(
+                f'SELECT id, ip_address, timestamp FROM {self.table} '
+                'WHERE timestamp >= ? AND timestamp < ? AND id <= ? ORDER BY id',
+                params, self.batch_size
+            ) for row in batch]
+            if not rows:
+                continue
+
+            directory = os.path.join(self.root, f"date={day}")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part-{rows[0][0]}-{rows[-1][0]}.parquet")
+            # Workers archiving the same day write identical files; the pid keeps their temp files apart
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            pd.DataFrame(rows, columns=COLUMNS).to_parquet(
+                tmp_path, engine="pyarrow", compression=self.compression, index=False
+            )
+            os.replace(tmp_path, path)
+
+            def delete_archived(conn):
+                c = conn.cursor()
+                c.execute(f'DELETE FROM {self.table} WHERE timestamp >= ? AND timestamp < ? AND id <= ?', params)
+                # Readers caching against the data version must not keep serving moved rows
+                c.execute("UPDATE counters SET value = value + 1 WHERE name = 'data_version'")
+
+            self.db.run_write(delete_archived)
+            archived += len(rows)
+            logger.info("Archived %d %s rows for %s to %s", len(rows), self.table, day, path)
+
+        if archived:
+            self._reclaim()
+        self.rows_archived += archived
+        self.runs += 1
+        self.last_run_at = time.monotonic()
+        return archived
+
+    def _reclaim(self):
+        """Return the pages freed by archiving to the filesystem, a few at a time (blocking)"""
+        # Deleted pages are reused, but the file (and every backup of it) only shrinks once they are vacuumed
+        def page_counts(conn):
+            return (conn.execute('PRAGMA auto_vacuum').fetchone()[0],
+                    conn.execute('PRAGMA freelist_count').fetchone()[0],
+                    conn.execute('PRAGMA page_count').fetchone()[0])
+
+        def incremental_vacuum(conn, pages):
+            # executescript steps the pragma to completion; execute() would free a single page
+            conn.executescript(f'PRAGMA incremental_vacuum({int(pages)})')
+
+        mode, free, total = self.db.run_read(page_counts)
+        if not free:
+            return
+        if mode != INCREMENTAL_VACUUM:
+            # Converting needs a full VACUUM, which would stall every queued write; leave it to the operator
+            if not self._warned_full_vacuum:
+                self._warned_full_vacuum = True
+                logger.warning(
+                    "%s has %d of %d pages free but predates incremental auto-vacuum; convert it once while "
+                    "writes are quiet: sqlite3 %s 'PRAGMA auto_vacuum = INCREMENTAL; VACUUM'",
+                    self.db.name, free, total, self.db.path,
+                )
+            return
+
+        # One short write per step, so group commits queued behind the writer lock get in between
+        reclaimed = 0
+        while reclaimed < free:
+            step = min(self.vacuum_step, free - reclaimed)
+            self.db.run_write(incremental_vacuum, step)
+            reclaimed += step
+            time.sleep(self.vacuum_pause)
+        self.pages_reclaimed += reclaimed
+        logger.info("Reclaimed %d of %d pages from %s", reclaimed, total, self.db.name)
+
+    async def start(self):
+        if self._task is None and self.after_days > 0:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.archive_now)
+            except Exception:
+                logger.exception("Error archiving %s", self.table)
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> dict:
+        partitions = self.partitions()
+        return {
+            "after_days": self.after_days,
+            "days": len({partition.day for partition in partitions}),
+            "files": len(partitions),
+            "bytes": sum(os.path.getsize(partition.path) for partition in partitions),
+            "rows_archived": self.rows_archived,
+            "pages_reclaimed": self.pages_reclaimed,
+            "runs": self.runs,
+            "seconds_since_last_run": round(time.monotonic() - self.last_run_at, 1) if self.last_run_at else None,
+        }
@@ -0,0 +1,129 @@
+import re
+from typing import List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Guard rails for the size of a single parameter grid
+MAX_GRID_VALUES = 100
+MAX_YEARS = 100
+
+# Fewer month-end closes than this give no complete month of returns
+MIN_HISTORY_MONTHS = 2
+
+
+class InsufficientHistory(ValueError):
+    """Not enough price history is stored yet (a server-side condition, not a bad request)"""
+
+
+def parse_grid(spec: str, cast=float) -> List:
+    """Parse "50", "50,100,200", "1..40" or "5..40:5" into a sorted list of values"""
+    values = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        match = re.fullmatch(r'(\d+)\.\.(\d+)(?::(\d+))?', part)
+        if match:
+            start, stop, step = int(match.group(1)), int(match.group(2)), int(match.group(3) or 1)
+            if stop < start or step < 1:
+                raise ValueError(f"Invalid range: {part}")
+            values.update(range(start, stop + 1, step))
+        else:
+            try:
+                values.add(cast(part))
+            except ValueError:
+                raise ValueError(f"Invalid value: {part}")
+        if len(values) > MAX_GRID_VALUES:
+            raise ValueError(f"At most {MAX_GRID_VALUES} values per parameter")
+    if not values:
+        raise ValueError("No values given")
+    return sorted(values)
+
+
+def monthly_closes(rows: Sequence[Tuple[str, float]]) -> pd.Series:
+    """Collapse (timestamp, close) daily bars into the last close of each month"""
+    if not rows:
+        return pd.Series(dtype=float)
+    timestamps, closes = zip(*rows)
+    daily = pd.Series(closes, index=pd.to_datetime([t[:10] for t in timestamps]), dtype=float)
+    return daily.groupby(daily.index.to_period('M')).last()
+
+
+def dca_outcomes(prices: np.ndarray, horizons: np.ndarray) -> np.ndarray:
+    """Value of investing 1 per month for every (start month, horizon) pair.
+
+    One unit of cash buys shares at each month's close for `h` months and
+    the position is valued at the close one month after the last purchase.
+    Returns a (starts, horizons) array with NaN where history runs out.
+    """
+    n = len(prices)
+    # cum_units[k] = shares bought with 1 per month over months [0, k)
+    cum_units = np.concatenate(([0.0], np.cumsum(1.0 / prices)))
+    starts = np.arange(n)[:, None]
+    ends = starts + horizons[None, :]
+    valid = ends < n
+    ends_clipped = np.where(valid, ends, 0)
+    units = cum_units[ends_clipped] - cum_units[starts]
+    values = units * prices[ends_clipped]
+    return np.where(valid, values, np.nan)
+
+
+def sip_backtest(series: pd.Series, monthly: Sequence[float], years: Sequence[int]) -> dict:
+    """Historical dollar-cost-averaging results for a grid of amounts and horizons"""
+    years = np.asarray(years, dtype=int)
+    if years.min() < 1 or years.max() > MAX_YEARS:
+        raise ValueError(f"Years must be between 1 and {MAX_YEARS}")
+    monthly = np.asarray(monthly, dtype=float)
+    if (monthly <= 0).any():
+        raise ValueError("Monthly amount must be positive")
+
+    prices = series.to_numpy(dtype=float)
+    if len(prices) < MIN_HISTORY_MONTHS:
+        raise InsufficientHistory("SPY price history is not available yet; try again shortly")
+    horizons = years * 12
+    per_unit = dca_outcomes(prices, horizons)
+
+    # Outcomes scale linearly with the monthly amount, so summarise once per horizon
+    scenarios = np.count_nonzero(~np.isnan(per_unit), axis=0)
+    has_data = scenarios > 0
+    with np.errstate(all='ignore'):
+        quantiles = np.full((5, len(horizons)), np.nan)
+        means = np.full(len(horizons), np.nan)
+        if has_data.any():
+            quantiles[:, has_data] = np.nanpercentile(per_unit[:, has_data], [0, 10, 50, 90, 100], axis=0)
+            means[has_data] = np.nanmean(per_unit[:, has_data], axis=0)
+        filled = np.where(np.isnan(per_unit), -np.inf, per_unit)
+        best = filled.argmax(axis=0)
+        worst = np.where(np.isnan(per_unit), np.inf, per_unit).argmin(axis=0)
+
+    months = [str(period) for period in series.index]
+    results = []
+    for amount in monthly:
+        for i, (y, h) in enumerate(zip(years, horizons)):
+            row = {
+                "monthly": float(amount),
+                "years": int(y),
+                "invested": float(amount * h),
+                "scenarios": int(scenarios[i]),
+            }
+            if has_data[i]:
+                low, p10, median, p90, high = (float(amount * q) for q in quantiles[:, i])
+                row.update({
+                    "min": low,
+                    "p10": p10,
+                    "median": median,
+                    "p90": p90,
+                    "max": high,
+                    "mean": float(amount * means[i]),
+                    "worst_start": months[worst[i]],
+                    "best_start": months[best[i]],
+                })
+            results.append(row)
+
+    return {
+        "history_months": len(prices),
+        "first_month": months[0],
+        "last_month": months[-1],
+        "results": results,
+    }
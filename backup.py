@@ -0,0 +1,154 @@
+import asyncio
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BackupScheduler:
+    """Background SQLite backups using the online backup API.
+
+    Writers only call `note_changes()`; a background task takes a consistent
+    snapshot once `change_threshold` changes have accumulated or `interval`
+    seconds have passed since the last backup with at least one change.
+    Snapshots are optionally gzip-compressed and only the newest `keep`
+    are retained.
+
+    With several worker processes, pass `change_counter` instead: a blocking
+    callable returning a running total of changes stored in the database,
+    which the task polls, so writes made by the other workers count too.
+    """
+
+    def __init__(self, db_path: str, backup_dir: str = 'backups', interval: float = 3600,
+                 change_threshold: int = 1000, keep: int = 5, compress: bool = False,
+                 poll_interval: float = 5.0, change_counter: Optional[Callable[[], int]] = None):
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self.interval = interval
+        self.change_threshold = change_threshold
+        self.keep = keep
+        self.compress = compress
+        self.poll_interval = poll_interval
+        self.change_counter = change_counter
+        self._counted_total: Optional[int] = None
+        self.pending_changes = 0
+        # note_changes() runs on the writer thread and backup_now() on another worker thread
+        self._changes_lock = threading.Lock()
+        self.last_backup_at = time.monotonic()
+        self.backups_taken = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def note_changes(self, count: int = 1):
+        with self._changes_lock:
+            self.pending_changes += count
+
+    def count_changes(self):
+        """Note the changes made since the last poll of `change_counter` (blocking)"""
+        total = self.change_counter()
+        if self._counted_total is not None and total > self._counted_total:
+            self.note_changes(total - self._counted_total)
+        self._counted_total = total
+
+    def _due(self) -> bool:
+        if self.pending_changes <= 0:
+            return False
+        if self.pending_changes >= self.change_threshold:
+            return True
+        return time.monotonic() - self.last_backup_at >= self.interval
+
+    def backup_now(self) -> str:
+        """Write a consistent snapshot of the database and prune old ones (blocking)"""
+        os.makedirs(self.backup_dir, exist_ok=True)
+        with self._changes_lock:
+            changes = self.pending_changes
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        backup_file = os.path.join(self.backup_dir, f'app_backup_{timestamp}.db')
+        # Per-process temp name: two processes backing up in the same second must not share it
+        tmp_file = f'{backup_file}.{os.getpid()}.tmp'
+
+        # The online backup API copies pages consistently while writers continue
+        src = sqlite3.connect(self.db_path)
+        dst = sqlite3.connect(tmp_file)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
+
+        if self.compress:
+            backup_file += '.gz'
+            with open(tmp_file, 'rb') as f_in, gzip.open(backup_file, 'wb', compresslevel=6) as f_out:
+                shutil.copyfileobj(f_in, f_out)
+            os.remove(tmp_file)
+        else:
+            os.replace(tmp_file, backup_file)
+
+        with self._changes_lock:
+            self.pending_changes -= changes
+        self.last_backup_at = time.monotonic()
+        self.backups_taken += 1
+        logger.info("Database backup created: %s", backup_file)
+        self._prune()
+        return backup_file
+
+    def _prune(self):
+        # Keep only the newest backups (names sort by timestamp)
+        backups = sorted(
+            f for f in os.listdir(self.backup_dir)
+            if f.startswith('app_backup_') and not f.endswith('.tmp')
+        )
+        for old_backup in backups[:-self.keep]:
+            os.remove(os.path.join(self.backup_dir, old_backup))
+            logger.info("Removed old backup: %s", old_backup)
+
+    async def start(self):
+        if self._task is None:
+            if self.change_counter is not None:
+                await asyncio.to_thread(self.count_changes)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the scheduler, taking a final backup if anything changed"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._counted_total is not None:
+            try:
+                await asyncio.to_thread(self.count_changes)
+            except Exception:
+                logger.exception("Error counting changes")
+        if self.pending_changes > 0:
+            try:
+                await asyncio.to_thread(self.backup_now)
+            except Exception:
+                logger.exception("Error creating final backup")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                if self.change_counter is not None:
+                    await asyncio.to_thread(self.count_changes)
+                if not self._due():
+                    continue
+                await asyncio.to_thread(self.backup_now)
+            except Exception:
+                logger.exception("Error creating backup")
+
+    def stats(self) -> dict:
+        return {
+            "pending_changes": self.pending_changes,
+            "backups_taken": self.backups_taken,
+            "seconds_since_last_backup": round(time.monotonic() - self.last_backup_at, 1),
+        }
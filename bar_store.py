@@ -0,0 +1,307 @@
+import asyncio
+import logging
+import re
+from datetime import date, timedelta
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+BAR_KEYS = ("t", "o", "h", "l", "c", "v")
+FIELDS = {"open": "o", "high": "h", "low": "l", "close": "c", "volume": "v"}
+SYMBOL = re.compile(r"[A-Z][A-Z0-9.]{0,9}")
+
+# A day this recent without a bar is refetched on every sync (the provider may
+# publish it late); older days without one are holidays or pre-listing dates
+RECENT_REFETCH_DAYS = 7
+
+
+class Timeframe(NamedTuple):
+    max_days: int    # longest window one /bars request may cover
+    chunk_days: int  # window per upstream request, so long ranges fetch in parallel
+
+
+# Alpaca's limit is shared by every symbol in a request; these chunks keep a
+# full batch of symbols within a single 10,000-bar page
+TIMEFRAMES = {
+    "1Hour": Timeframe(max_days=366, chunk_days=30),
+    "1Day": Timeframe(max_days=20 * 366, chunk_days=4 * 365),
+    "1Week": Timeframe(max_days=20 * 366, chunk_days=20 * 366),
+    "1Month": Timeframe(max_days=20 * 366, chunk_days=20 * 366),
+}
+
+
+class BarStore:
+    """Local SQLite store of daily bars keyed by (symbol, date).
+
+    Bars accumulate across refreshes, so only bars newer than the last
+    stored date ever need to be fetched from Alpaca, and the app can serve
+    chart data from disk after a restart without touching the network.
+    Methods are blocking; call them from a worker thread.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def init(self):
+        self.db.run_write(self._create_schema)
+
+    @staticmethod
+    def _create_schema(conn):
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS bars
+            (symbol TEXT NOT NULL,
+             date TEXT NOT NULL,
+             timestamp TEXT NOT NULL,
+             open REAL,
+             high REAL,
+             low REAL,
+             close REAL NOT NULL,
+             volume REAL,
+             PRIMARY KEY (symbol, date)) WITHOUT ROWID
+        ''')
+        # Date range already fetched per symbol, including days without bars
+        # (holidays, dates before a listing), so gaps are never refetched
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS bar_coverage
+            (symbol TEXT PRIMARY KEY,
+             start TEXT NOT NULL,
+             end TEXT NOT NULL)
+        ''')
+        conn.execute('''
+            INSERT OR IGNORE INTO bar_coverage (symbol, start, end)
+            SELECT symbol, MIN(date), MAX(date) FROM bars GROUP BY symbol
+        ''')
+
+    def last_date(self, symbol: str) -> Optional[date]:
+        row = self.db.run_read(
+            lambda conn: conn.execute('SELECT MAX(date) FROM bars WHERE symbol = ?', (symbol,)).fetchone()
+        )
+        return date.fromisoformat(row[0]) if row and row[0] else None
+
+    def span(self, symbol: str) -> Optional[Tuple[date, date]]:
+        """First and last stored dates, e.g. to tell when derived series are stale"""
+        row = self.db.run_read(
+            lambda conn: conn.execute('SELECT MIN(date), MAX(date) FROM bars WHERE symbol = ?', (symbol,)).fetchone()
+        )
+        return (date.fromisoformat(row[0]), date.fromisoformat(row[1])) if row and row[0] else None
+
+    def coverage(self, symbols: Sequence[str]) -> Dict[str, Tuple[date, date]]:
+        """Already-fetched (start, end) date range per symbol"""
+        placeholders = ",".join("?" * len(symbols))
+        rows = self.db.run_read(lambda conn: conn.execute(
+            f'SELECT symbol, start, end FROM bar_coverage WHERE symbol IN ({placeholders})', list(symbols)
+        ).fetchall())
+        return {symbol: (date.fromisoformat(start), date.fromisoformat(end)) for symbol, start, end in rows}
+
+    def extend_coverage(self, symbols: Sequence[str], start: date, end: date):
+        self.db.run_write(lambda conn: conn.executemany('''
+            INSERT INTO bar_coverage (symbol, start, end) VALUES (?, ?, ?)
+            ON CONFLICT (symbol) DO UPDATE SET
+                start = MIN(start, excluded.start),
+                end = MAX(end, excluded.end)
+        ''', [(symbol, start.isoformat(), end.isoformat()) for symbol in symbols]))
+
+    def upsert(self, symbol: str, bars: list) -> int:
+        """Merge Alpaca bar dicts into the store, replacing bars for the same date"""
+        rows = [
+            (symbol, bar['t'][:10], bar['t'], bar.get('o'), bar.get('h'), bar.get('l'), bar['c'], bar.get('v'))
+            for bar in bars
+        ]
+        if not rows:
+            return 0
+        self.db.run_write(lambda conn: conn.executemany('''
+            INSERT INTO bars (symbol, date, timestamp, open, high, low, close, volume)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (symbol, date) DO UPDATE SET
+                timestamp = excluded.timestamp,
+                open = excluded.open,
+                high = excluded.high,
+                low = excluded.low,
+                close = excluded.close,
+                volume = excluded.volume
+        ''', rows))
+        return len(rows)
+
+    def closes(self, symbol: str, start: Optional[date] = None, end: Optional[date] = None) -> List[Tuple[str, float]]:
+        """Return (timestamp, close) pairs in date order"""
+        query = 'SELECT timestamp, close FROM bars WHERE symbol = ?'
+        params = [symbol]
+        if start is not None:
+            query += ' AND date >= ?'
+            params.append(start.isoformat())
+        if end is not None:
+            query += ' AND date <= ?'
+            params.append(end.isoformat())
+        query += ' ORDER BY date'
+        return self.db.run_read(lambda conn: conn.execute(query, params).fetchall())
+
+    def bars(self, symbols: Sequence[str], start: date, end: date) -> Dict[str, list]:
+        """Bars per symbol in date order, as Alpaca-style dicts (t, o, h, l, c, v)"""
+        def query(conn):
+            return {
+                symbol: [dict(zip(BAR_KEYS, row)) for row in conn.execute(
+                    'SELECT timestamp, open, high, low, close, volume FROM bars '
+                    'WHERE symbol = ? AND date >= ? AND date <= ? ORDER BY date',
+                    (symbol, start.isoformat(), end.isoformat())
+                )]
+                for symbol in symbols
+            }
+        return self.db.run_read(query)
+
+
+def split_range(start: date, end: date, days: int) -> List[Tuple[date, date]]:
+    """Consecutive inclusive windows of at most `days` days covering [start, end]"""
+    windows = []
+    while start <= end:
+        window_end = min(end, start + timedelta(days=days - 1))
+        windows.append((start, window_end))
+        start = window_end + timedelta(days=1)
+    return windows
+
+
+def uncovered(coverage: Optional[Tuple[date, date]], start: date, end: date) -> List[Tuple[date, date]]:
+    """Parts of [start, end] outside `coverage`, keeping the covered range contiguous"""
+    if coverage is None:
+        return [(start, end)]
+    gaps = []
+    if start < coverage[0]:
+        gaps.append((start, coverage[0] - timedelta(days=1)))
+    if end > coverage[1]:
+        gaps.append((coverage[1] + timedelta(days=1), end))
+    return gaps
+
+
+def parse_symbols(spec: str, max_symbols: int) -> List[str]:
+    symbols = list(dict.fromkeys(part.strip().upper() for part in spec.split(",") if part.strip()))
+    if not symbols:
+        raise ValueError("At least one symbol is required")
+    if len(symbols) > max_symbols:
+        raise ValueError(f"At most {max_symbols} symbols per request")
+    for symbol in symbols:
+        if not SYMBOL.fullmatch(symbol):
+            raise ValueError(f"Invalid symbol: {symbol}")
+    return symbols
+
+
+def parse_fields(spec: str) -> List[str]:
+    fields = list(dict.fromkeys(part.strip().lower() for part in spec.split(",") if part.strip()))
+    for field in fields:
+        if field not in FIELDS:
+            raise ValueError(f"fields must be from: {', '.join(FIELDS)}")
+    return fields or ["close"]
+
+
+def bars_window(timeframe: str, start: Optional[str], end: Optional[str], latest: date) -> Tuple[date, date]:
+    """Resolve from/to (default: the year up to `latest`) and check them against the timeframe"""
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f"timeframe must be one of: {', '.join(TIMEFRAMES)}")
+    end_date = min(date.fromisoformat(end), latest) if end else latest
+    start_date = date.fromisoformat(start) if start else end_date - timedelta(days=365)
+    if start_date > end_date:
+        raise ValueError("from must not be after to")
+    if (end_date - start_date).days > TIMEFRAMES[timeframe].max_days:
+        raise ValueError(f"{timeframe} bars are limited to {TIMEFRAMES[timeframe].max_days} days per request")
+    return start_date, end_date
+
+
+def align_bars(bars_by_symbol: Dict[str, list], fields: Sequence[str]) -> dict:
+    """Columnar series on the union of all timestamps, None where a symbol has no bar"""
+    timestamps = sorted({bar["t"] for bars in bars_by_symbol.values() for bar in bars})
+    index = {timestamp: i for i, timestamp in enumerate(timestamps)}
+    series = {}
+    for symbol, bars in bars_by_symbol.items():
+        columns = {field: [None] * len(timestamps) for field in fields}
+        for bar in bars:
+            i = index[bar["t"]]
+            for field in fields:
+                columns[field][i] = bar.get(FIELDS[field])
+        series[symbol] = columns
+    return {"timestamps": timestamps, "series": series}
+
+
+class BarFetcher:
+    """Concurrent, paginated bar fetches with one upstream concurrency limit.
+
+    A date range is split into the timeframe's chunk windows and symbols into
+    batches; each (batch, window) pair is one paginated Alpaca request, and
+    every request from every caller waits on the same semaphore. Daily bars
+    go through the BarStore so only dates outside a symbol's coverage are
+    ever fetched.
+    """
+
+    def __init__(self, client, store: BarStore, max_concurrency: int = 4, batch_size: int = 5):
+        self.client = client
+        self.store = store
+        self.max_concurrency = max_concurrency
+        self.batch_size = batch_size
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.requests = 0
+        self.in_flight = 0
+
+    async def _fetch_window(self, symbols: List[str], start: date, end: date, timeframe: str) -> Dict[str, list]:
+        async with self._semaphore:
+            self.requests += 1
+            self.in_flight += 1
+            try:
+                return await self.client.get_multi_bars(symbols, start.isoformat(), end.isoformat(), timeframe)
+            finally:
+                self.in_flight -= 1
+
+    async def fetch(self, symbols: Sequence[str], start: date, end: date, timeframe: str) -> Dict[str, list]:
+        """Fetch bars straight from Alpaca, merged per symbol in time order"""
+        batches = [list(symbols[i:i + self.batch_size]) for i in range(0, len(symbols), self.batch_size)]
+        windows = split_range(start, end, TIMEFRAMES[timeframe].chunk_days)
+        results = await asyncio.gather(*(
+            self._fetch_window(batch, window_start, window_end, timeframe)
+            for batch in batches for window_start, window_end in windows
+        ))
+        merged: Dict[str, list] = {symbol: [] for symbol in symbols}
+        for result in results:
+            for symbol, bars in result.items():
+                merged.setdefault(symbol, []).extend(bars)
+        for bars in merged.values():
+            bars.sort(key=lambda bar: bar["t"])
+        return merged
+
+    async def sync(self, symbols: Sequence[str], start: date, end: date) -> int:
+        """Store daily bars for whatever part of [start, end] each symbol has not fetched yet"""
+        coverage = await asyncio.to_thread(self.store.coverage, symbols)
+        # Symbols missing the same range are fetched together
+        gaps: Dict[Tuple[date, date], List[str]] = {}
+        for symbol in symbols:
+            for gap in uncovered(coverage.get(symbol), start, end):
+                gaps.setdefault(gap, []).append(symbol)
+        if not gaps:
+            return 0
+
+        results = await asyncio.gather(*(
+            self.fetch(group, gap_start, gap_end, "1Day") for (gap_start, gap_end), group in gaps.items()
+        ))
+        stored = 0
+        for ((gap_start, gap_end), group), bars_by_symbol in zip(gaps.items(), results):
+            covered_ends: Dict[date, List[str]] = {}
+            for symbol in group:
+                bars = bars_by_symbol.get(symbol, [])
+                stored += await asyncio.to_thread(self.store.upsert, symbol, bars)
+                covered_end = gap_end
+                if gap_end == end:
+                    # The newest days may only be missing because the provider is late: cover them
+                    # once their bar arrives, and days older than the window without one regardless
+                    last_bar = date.fromisoformat(bars[-1]["t"][:10]) if bars else None
+                    floor = gap_end - timedelta(days=RECENT_REFETCH_DAYS)
+                    covered_end = max(last_bar, floor) if last_bar else floor
+                if covered_end >= gap_start:
+                    covered_ends.setdefault(covered_end, []).append(symbol)
+            # Only recorded once the whole gap is stored, so a failed fetch is retried
+            for covered_end, covered in covered_ends.items():
+                await asyncio.to_thread(self.store.extend_coverage, covered, gap_start, covered_end)
+            logger.info("Stored daily bars for %s from %s to %s", ",".join(group), gap_start, gap_end)
+        return stored
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "batch_size": self.batch_size,
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+        }
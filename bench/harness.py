@@ -0,0 +1,144 @@
+"""Boot the app in-process against a throwaway database and the Alpaca stub."""
+import asyncio
+import os
+import shutil
+import socket
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from typing import Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+BENCH_PASSWORD = "bench"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def raise_fd_limit():
+    """Thousands of WebSockets need more descriptors than the usual soft limit"""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard if hard != resource.RLIM_INFINITY else 65536, hard))
+
+
+def seed_database(path: str, rows: int):
+    """Pre-fill the raw tables; the app derives counters, rollups and sketches on start"""
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS interest_data
+        (id INTEGER PRIMARY KEY AUTOINCREMENT,
+         ip_address TEXT,
+         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS email_subscribers
+        (id INTEGER PRIMARY KEY AUTOINCREMENT,
+         email TEXT UNIQUE,
+         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)
+    ''')
+    conn.executemany(
+        "INSERT INTO interest_data (ip_address, timestamp) VALUES (?, datetime('now', ?))",
+        ((f"10.{i % 251}.{i % 241}.{i % 239}", f"-{i % (90 * 24 * 60)} minutes") for i in range(rows))
+    )
+    conn.executemany(
+        "INSERT INTO email_subscribers (email, timestamp) VALUES (?, datetime('now', ?))",
+        ((f"seed{i}@example.com", f"-{i} minutes") for i in range(rows // 20))
+    )
+    conn.commit()
+    conn.close()
+
+
+class BenchServer:
+    """Context manager serving `app.app` and the Alpaca stub on local ports.
+
+    The servers run on their own event loop in a background thread, so the
+    load generator in the calling thread does not share their loop.
+    """
+
+    def __init__(self, seed_rows: int = 20000, stub_latency: float = 0.0, http_clients: int = 32):
+        self.seed_rows = seed_rows
+        self.stub_latency = stub_latency
+        self.http_clients = http_clients
+        self.port = free_port()
+        self.stub_port = free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.ws_url = f"ws://127.0.0.1:{self.port}"
+        self.password = BENCH_PASSWORD
+        self._workdir: Optional[str] = None
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "BenchServer":
+        raise_fd_limit()
+        self._workdir = tempfile.mkdtemp(prefix="vault-bench-")
+        os.environ.update({
+            "DATABASE_PATH": os.path.join(self._workdir, "app.db"),
+            "BAR_STORE_PATH": os.path.join(self._workdir, "market_data.db"),
+            "BACKUP_DIR": os.path.join(self._workdir, "backups"),
+            # The seed spans 90 days, so the archiver runs; keep its Parquet files in the throwaway dir too
+            "ARCHIVE_DIR": os.path.join(self._workdir, "archive"),
+            "ALPACA_BASE_URL": f"http://127.0.0.1:{self.stub_port}",
+            "ALPACA_API_KEY": "bench",
+            "ALPACA_API_SECRET": "bench",
+            "ADMIN_PASSWORD": BENCH_PASSWORD,
+            "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+            # Every bench client shares one address; keep the limiter in the path but never tripped
+            "INTEREST_RATE_PER_SECOND": "0",
+            "SUBSCRIBE_RATE_PER_SECOND": "0",
+            "INTEREST_MAX_CONCURRENCY": "0",
+            "SUBSCRIBE_MAX_CONCURRENCY": "0",
+            # Otherwise most concurrent export requests would time the 503 refusal, not an export
+            "EXPORT_MAX_STREAMS": str(max(4, self.http_clients)),
+        })
+        seed_database(os.environ["DATABASE_PATH"], self.seed_rows)
+
+        import uvicorn
+        from alpaca_stub import create_stub_app
+        import app as app_module
+
+        config = uvicorn.Config(
+            app_module.app, host="127.0.0.1", port=self.port,
+            log_level="warning", lifespan="on", backlog=4096,
+        )
+        self._server = uvicorn.Server(config)
+        stub = create_stub_app(latency=self.stub_latency)
+
+        async def serve():
+            from aiohttp import web
+            runner = web.AppRunner(stub)
+            await runner.setup()
+            await web.TCPSite(runner, "127.0.0.1", self.stub_port).start()
+            try:
+                await self._server.serve()
+            finally:
+                await runner.cleanup()
+
+        self._thread = threading.Thread(target=asyncio.run, args=(serve(),), name="bench-server", daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + 60
+        while not self._server.started:
+            if not self._thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("Benchmark server failed to start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        if self._server is not None:
+            self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(30)
+        if self._workdir is not None:
+            shutil.rmtree(self._workdir, ignore_errors=True)
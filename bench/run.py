@@ -0,0 +1,302 @@
+"""Load and latency benchmarks for every route.
+
+Boots the app in-process (see harness.py), drives each scenario for a fixed
+duration with a fixed number of closed-loop clients, and prints throughput
+and p50/p95/p99 latency as JSON:
+
+    python -m bench.run --duration 10 --save-baseline bench/baseline.json
+    python -m bench.run --duration 10 --baseline bench/baseline.json
+
+With --baseline, any scenario whose throughput drops, whose p95/p99
+latency or error rate grows by more than --tolerance, or that has errors
+where the baseline had none, is reported and the exit status is 1.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from bench.harness import ROOT, BenchServer
+
+# Share of requests per route in the "mixed" scenario
+MIX = {
+    "landing": 30,
+    "sp500": 30,
+    "increment": 25,
+    "admin_stats": 9,
+    "subscribe": 5,
+    "csv_export": 1,
+}
+
+HTTP_SCENARIOS = list(MIX) + ["mixed"]
+ALL_SCENARIOS = HTTP_SCENARIOS + ["websocket"]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "throughput_rps": round(len(values) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(values, 50) * 1000, 2),
+            "p95": round(percentile(values, 95) * 1000, 2),
+            "p99": round(percentile(values, 99) * 1000, 2),
+            "max": round(values[-1] * 1000, 2) if values else 0.0,
+        },
+    }
+
+
+def make_requests(password: str) -> Dict[str, Callable[[aiohttp.ClientSession, int], object]]:
+    """Route name -> function issuing one request (as an async context manager)"""
+    run_id = int(time.time())
+    return {
+        "landing": lambda session, i: session.get("/"),
+        "sp500": lambda session, i: session.get("/sp500-data"),
+        "increment": lambda session, i: session.post("/increment-interest"),
+        "subscribe": lambda session, i: session.post("/subscribe", json={"email": f"bench{run_id}-{i}@example.com"}),
+        "admin_stats": lambda session, i: session.get("/admin/stats", params={"password": password}),
+        "csv_export": lambda session, i: session.get("/admin/download-csv", params={"password": password}),
+    }
+
+
+async def run_http(server: BenchServer, name: str, duration: float, concurrency: int, seed: int) -> dict:
+    requests = make_requests(server.password)
+    rng = random.Random(seed)
+    if name == "mixed":
+        routes, weights = list(MIX), list(MIX.values())
+        schedule = rng.choices(routes, weights, k=100_000)
+    else:
+        schedule = [name]
+
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(10 ** 9))
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(server.base_url, connector=connector) as session:
+        deadline = time.perf_counter() + duration
+
+        async def client():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                i = next(counter)
+                route = schedule[i % len(schedule)]
+                started = time.perf_counter()
+                try:
+                    async with requests[route](session, i) as response:
+                        await response.read()
+                        ok = response.status < 400
+                except aiohttp.ClientError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return summarize(latencies, errors, elapsed)
+
+
+async def run_websocket(server: BenchServer, clients: int, updates: int, interval: float) -> dict:
+    """Connect `clients` sockets, click `updates` times, and time each delivery.
+
+    Delivery latency is measured from sending a click to a socket receiving
+    a count at least as large as the one that click produced.
+    """
+    connect_latencies: List[float] = []
+    received: List[List[tuple]] = []
+    connect_errors = 0
+    semaphore = asyncio.Semaphore(256)
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        sockets = []
+
+        async def connect():
+            nonlocal connect_errors
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    ws = await session.ws_connect(f"{server.ws_url}/ws/interest", heartbeat=None)
+                    await ws.receive_json(timeout=30)
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    connect_errors += 1
+                    return
+                connect_latencies.append(time.perf_counter() - started)
+                sockets.append(ws)
+
+        await asyncio.gather(*(connect() for _ in range(clients)))
+
+        async def listen(ws, log):
+            async for message in ws:
+                if message.type == aiohttp.WSMsgType.TEXT:
+                    log.append((time.perf_counter(), json.loads(message.data)["count"]))
+
+        listeners = []
+        for ws in sockets:
+            log: List[tuple] = []
+            received.append(log)
+            listeners.append(asyncio.ensure_future(listen(ws, log)))
+
+        clicks = []
+        for _ in range(updates):
+            started = time.perf_counter()
+            async with session.post(f"{server.base_url}/increment-interest") as response:
+                clicks.append((started, (await response.json())["count"]))
+            await asyncio.sleep(interval)
+        await asyncio.sleep(1.0)
+
+        for ws in sockets:
+            await ws.close()
+        await asyncio.gather(*listeners, return_exceptions=True)
+
+    deliveries: List[float] = []
+    missed = 0
+    for log in received:
+        position = 0
+        for sent_at, count in clicks:
+            while position < len(log) and log[position][1] < count:
+                position += 1
+            if position == len(log):
+                missed += 1
+                continue
+            deliveries.append(max(0.0, log[position][0] - sent_at))
+
+    connect = summarize(connect_latencies, connect_errors, 1.0)
+    delivery = summarize(deliveries, missed, 1.0)
+    return {
+        "clients": len(sockets),
+        "connect_errors": connect_errors,
+        "updates": updates,
+        "missed_deliveries": missed,
+        "connect_latency_ms": connect["latency_ms"],
+        "delivery_latency_ms": delivery["latency_ms"],
+    }
+
+
+def error_counts(result: dict) -> Tuple[int, int]:
+    """(failed, attempted) requests or WebSocket connections of one scenario"""
+    if "connect_errors" in result:
+        return result["connect_errors"], result["clients"] + result["connect_errors"]
+    return result["errors"], result["requests"] + result["errors"]
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Human-readable regressions of `results` against `baseline`"""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        # Failing fast can look like a speed-up, so errors are checked before any timing
+        errors, attempts = error_counts(current)
+        before_errors, before_attempts = error_counts(previous)
+        rate = errors / attempts if attempts else 0.0
+        before_rate = before_errors / before_attempts if before_attempts else 0.0
+        if errors and not before_errors:
+            regressions.append(f"{name}: {errors} errors, baseline had none")
+        elif rate > before_rate * (1 + tolerance):
+            regressions.append(f"{name}: error rate {rate:.2%} > baseline {before_rate:.2%}")
+        if "throughput_rps" in current and previous.get("throughput_rps"):
+            if current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+                regressions.append(
+                    f"{name}: throughput {current['throughput_rps']} rps < baseline {previous['throughput_rps']} rps"
+                )
+        key = "latency_ms" if "latency_ms" in current else "delivery_latency_ms"
+        for pct in ("p95", "p99"):
+            now, before = current[key][pct], previous.get(key, {}).get(pct)
+            # Ignore sub-millisecond noise
+            if before and now > before * (1 + tolerance) and now - before > 1.0:
+                regressions.append(f"{name}: {key} {pct} {now} ms > baseline {before} ms")
+    return regressions
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    results = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "args": vars(args),
+        },
+        "scenarios": {},
+    }
+    with BenchServer(seed_rows=args.seed_rows, stub_latency=args.stub_latency,
+                     http_clients=args.concurrency) as server:
+        for name in args.scenarios:
+            if name == "websocket":
+                result = await run_websocket(server, args.ws_clients, args.ws_updates, args.ws_interval)
+            else:
+                result = await run_http(server, name, args.duration, args.concurrency, args.seed)
+            results["scenarios"][name] = result
+            print(f"{name}: {json.dumps(result)}", file=sys.stderr)
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", default=ALL_SCENARIOS, choices=ALL_SCENARIOS)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per HTTP scenario")
+    parser.add_argument("--concurrency", type=int, default=32, help="closed-loop HTTP clients")
+    parser.add_argument("--ws-clients", type=int, default=2000)
+    parser.add_argument("--ws-updates", type=int, default=50)
+    parser.add_argument("--ws-interval", type=float, default=0.05, help="seconds between clicks")
+    parser.add_argument("--seed-rows", type=int, default=20000, help="interest rows in the temp database")
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="Alpaca stub response delay")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the mixed-route schedule")
+    parser.add_argument("--output", help="write results JSON here instead of stdout")
+    parser.add_argument("--baseline", help="compare against this results JSON")
+    parser.add_argument("--save-baseline", help="also write the results here as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(output + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
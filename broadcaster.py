@@ -0,0 +1,132 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, Optional
+
+from starlette.websockets import WebSocket
+
+from metrics import BROADCAST_FANOUT, WEBSOCKET_SEND_LATENCY
+
+logger = logging.getLogger(__name__)
+
+
+class _Subscriber:
+    __slots__ = ("websocket", "queue", "task")
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.task: Optional[asyncio.Task] = None
+
+
+class Broadcaster:
+    """Fan out the latest interest count to every connected WebSocket.
+
+    Each socket gets a bounded send queue drained by its own task, so one
+    slow client never delays the others. Updates are coalesced: however many
+    arrive, at most one payload (the latest) goes out per `interval`, and it
+    is serialised once and shared by all clients. A socket whose queue is
+    full or whose send takes longer than `send_timeout` is evicted.
+    """
+
+    def __init__(self, interval: float = 0.1, queue_size: int = 8, send_timeout: float = 5.0):
+        self.interval = interval
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self._subscribers: Dict[WebSocket, _Subscriber] = {}
+        self._latest = None
+        self._sent = None
+        self._last_flush = 0.0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self.flushes = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    @staticmethod
+    def encode(count: int) -> str:
+        return json.dumps({"count": count})
+
+    def connect(self, websocket: WebSocket, initial_count: int):
+        """Register an accepted socket and queue its initial count"""
+        subscriber = _Subscriber(websocket, self.queue_size)
+        subscriber.queue.put_nowait(self.encode(initial_count))
+        subscriber.task = asyncio.get_running_loop().create_task(self._sender(subscriber))
+        self._subscribers[websocket] = subscriber
+
+    def disconnect(self, websocket: WebSocket):
+        subscriber = self._subscribers.pop(websocket, None)
+        if subscriber is not None and subscriber.task is not None:
+            subscriber.task.cancel()
+
+    def publish(self, count: int):
+        """Record a new count; it is delivered on the next coalesced flush"""
+        # Local and cross-worker updates can arrive out of order; counts only grow
+        if self._latest is not None and count <= self._latest:
+            return
+        self._latest = count
+        if self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            delay = max(0.0, self._last_flush + self.interval - loop.time())
+            self._flush_handle = loop.call_later(delay, self._flush)
+
+    def _flush(self):
+        self._flush_handle = None
+        self._last_flush = asyncio.get_running_loop().time()
+        if self._latest is None or self._latest == self._sent:
+            return
+        self._sent = self._latest
+        self.flushes += 1
+
+        with BROADCAST_FANOUT.time():
+            payload = self.encode(self._latest)
+            for subscriber in list(self._subscribers.values()):
+                try:
+                    subscriber.queue.put_nowait(payload)
+                except asyncio.QueueFull:
+                    self._evict(subscriber, "send queue full")
+
+    async def _sender(self, subscriber: _Subscriber):
+        try:
+            while True:
+                payload = await subscriber.queue.get()
+                started = time.perf_counter()
+                await asyncio.wait_for(subscriber.websocket.send_text(payload), self.send_timeout)
+                WEBSOCKET_SEND_LATENCY.observe(time.perf_counter() - started)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._evict(subscriber, str(e) or type(e).__name__)
+
+    def _evict(self, subscriber: _Subscriber, reason: str):
+        if self._subscribers.pop(subscriber.websocket, None) is None:
+            return
+        self.evictions += 1
+        logger.info("Evicting WebSocket client: %s", reason)
+        if subscriber.task is not None and subscriber.task is not asyncio.current_task():
+            subscriber.task.cancel()
+        asyncio.get_running_loop().create_task(self._close(subscriber.websocket))
+
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        try:
+            # 1013: try again later
+            await asyncio.wait_for(websocket.close(code=1013), 1.0)
+        except Exception:
+            pass
+
+    async def close(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        for websocket in list(self._subscribers):
+            self.disconnect(websocket)
+
+    def stats(self) -> dict:
+        return {
+            "connections": len(self._subscribers),
+            "flushes": self.flushes,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,257 @@
+"""Build fingerprinted, precompressed static assets.
+
+Copies everything under static/ into static/build/ with a content hash in
+each filename and writes static/build/manifest.json, which the templates'
+url_for() uses to link the hashed names. Text assets also get .gz and .br
+siblings that the static handler serves directly, and raster images get
+WebP/AVIF variants at responsive widths, referenced from the CSS through
+image-set() and width media queries. Run it before starting the app:
+
+    python build_assets.py
+
+Pillow (image variants) and brotli (.br files) are optional; whatever they
+would produce is skipped, with an error logged, when they are missing. AVIF
+needs Pillow 11.2 or later. With --strict, a missing image encoder fails the
+build instead.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+from typing import Dict, List
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+
+logger = logging.getLogger("build_assets")
+
+STATIC_DIR = "static"
+BUILD_DIRNAME = "build"
+MANIFEST_NAME = "manifest.json"
+
+TEXT_EXTENSIONS = {".css", ".js", ".svg", ".json", ".txt", ".html"}
+RASTER_EXTENSIONS = {".png", ".jpg", ".jpeg"}
+
+# Responsive widths for image variants; never upscaled past the original
+IMAGE_WIDTHS = (640, 1280, 1920, 2880)
+IMAGE_FORMATS = (
+    # (extension, Pillow format, MIME type, save options)
+    ("avif", "AVIF", "image/avif", {"quality": 55, "speed": 6}),
+    ("webp", "WEBP", "image/webp", {"quality": 80, "method": 6}),
+)
+
+STATIC_URL = re.compile(r"""url\(\s*(['"]?)/static/([^'")]+)\1\s*\)""")
+CSS_RULE = re.compile(r"([^{}@]+)\{([^{}]*)\}")
+CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def hashed_name(path: str, data: bytes, suffix: str = "") -> str:
+    root, ext = os.path.splitext(path)
+    return f"{root}{suffix}.{content_hash(data)}{ext}"
+
+
+class AssetBuilder:
+    def __init__(self, static_dir: str = STATIC_DIR, gzip_level: int = 9, brotli_quality: int = 11,
+                 strict: bool = False):
+        self.static_dir = static_dir
+        self.build_dir = os.path.join(static_dir, BUILD_DIRNAME)
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.strict = strict
+        self.files: Dict[str, str] = {}
+        self.variants: Dict[str, List[dict]] = {}
+
+    def sources(self) -> List[str]:
+        paths = []
+        for root, dirs, files in os.walk(self.static_dir):
+            dirs[:] = [d for d in dirs if os.path.join(root, d) != self.build_dir]
+            for name in files:
+                paths.append(os.path.relpath(os.path.join(root, name), self.static_dir).replace(os.sep, "/"))
+        return sorted(paths)
+
+    def write(self, relative: str, data: bytes):
+        target = os.path.join(self.build_dir, relative)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(data)
+        ext = os.path.splitext(relative)[1]
+        if ext in TEXT_EXTENSIONS:
+            self.precompress(target, data)
+
+    def precompress(self, target: str, data: bytes):
+        """Write .gz/.br siblings when they are actually smaller"""
+        compressed = gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+        if len(compressed) < len(data):
+            with open(target + ".gz", "wb") as f:
+                f.write(compressed)
+        if brotli is not None:
+            compressed = brotli.compress(data, quality=self.brotli_quality)
+            if len(compressed) < len(data):
+                with open(target + ".br", "wb") as f:
+                    f.write(compressed)
+
+    def add(self, path: str, data: bytes) -> str:
+        built = hashed_name(path, data)
+        self.write(built, data)
+        self.files[path] = built
+        return built
+
+    def missing_encoder(self, message: str, *args):
+        if self.strict:
+            raise RuntimeError(message % args)
+        logger.error(message, *args)
+
+    def build_image(self, path: str, data: bytes):
+        self.add(path, data)
+        if Image is None:
+            self.missing_encoder("Pillow is not installed; %s gets no WebP/AVIF variants", path)
+            return
+        with Image.open(os.path.join(self.static_dir, path)) as original:
+            original.load()
+            image = original.convert("RGBA" if "A" in original.getbands() else "RGB")
+        widths = sorted({min(width, image.width) for width in IMAGE_WIDTHS})
+        variants = []
+        for extension, image_format, mime, options in IMAGE_FORMATS:
+            if not features.check(extension):
+                self.missing_encoder("Pillow %s has no %s encoder; %s gets no %s variants",
+                                     Image.__version__, image_format, path, image_format)
+                continue
+            for width in widths:
+                height = round(image.height * width / image.width)
+                resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+                target = os.path.join(self.build_dir, "tmp-variant")
+                os.makedirs(self.build_dir, exist_ok=True)
+                resized.save(target, image_format, **options)
+                with open(target, "rb") as f:
+                    encoded = f.read()
+                os.remove(target)
+                root = os.path.splitext(path)[0]
+                built = hashed_name(f"{root}.{extension}", encoded, suffix=f"-{width}")
+                self.write(built, encoded)
+                variants.append({"width": width, "type": mime, "path": built, "bytes": len(encoded)})
+        self.variants[path] = variants
+
+    def image_set(self, path: str, width: int) -> str:
+        """image-set() of the best variant per format for `width`, original last"""
+        candidates = []
+        for _, _, mime, _ in IMAGE_FORMATS:
+            sized = [v for v in self.variants[path] if v["type"] == mime]
+            if not sized:
+                continue
+            fitting = [v for v in sized if v["width"] >= width] or sized[-1:]
+            choice = min(fitting, key=lambda v: v["width"])
+            candidates.append(f'url("/static/{BUILD_DIRNAME}/{choice["path"]}") type("{mime}")')
+        candidates.append(f'url("/static/{BUILD_DIRNAME}/{self.files[path]}") type("{self.mime(path)}")')
+        return "image-set(" + ", ".join(candidates) + ")"
+
+    @staticmethod
+    def mime(path: str) -> str:
+        return "image/png" if path.endswith(".png") else "image/jpeg"
+
+    def rewrite_css(self, css: str) -> str:
+        """Point /static/ URLs at hashed files and add responsive image-set() rules"""
+        media_rules: Dict[int, List[str]] = {}
+
+        def hashed_url(match):
+            path = match.group(2)
+            if path not in self.files:
+                return match.group(0)
+            return f'url("/static/{BUILD_DIRNAME}/{self.files[path]}")'
+
+        def rewrite_rule(match):
+            selector, body = match.group(1), match.group(2)
+            declarations = []
+            responsive = None
+            for declaration in body.split(";"):
+                images = [p for p in STATIC_URL.findall(declaration) if p[1] in self.variants and self.variants[p[1]]]
+                declarations.append(STATIC_URL.sub(hashed_url, declaration))
+                prop = declaration.split(":", 1)[0].strip()
+                if responsive is not None and prop.startswith("background"):
+                    # A `background` shorthand resets size/position, so the overrides repeat them
+                    responsive[2].append(declaration.strip())
+                if not images or ":" not in declaration or responsive is not None:
+                    continue
+                value = declaration.split(":", 1)[1]
+                path = images[0][1]
+
+                def with_image_set(width, path=path, value=value):
+                    return STATIC_URL.sub(lambda m: self.image_set(m.group(2), width) if m.group(2) == path
+                                          else hashed_url(m), value)
+
+                responsive = (prop, with_image_set, [], sorted({v["width"] for v in self.variants[path]}, reverse=True))
+                # Browsers without image-set() type() support drop this and keep the fallback above
+                declarations.append(f"\n    {prop}:{with_image_set(responsive[3][0])}")
+
+            if responsive is not None:
+                prop, with_image_set, trailing, widths = responsive
+                selector_text = CSS_COMMENT.sub("", selector).strip()
+                for width in widths[1:]:
+                    body = ";".join([f"{prop}:{with_image_set(width)}"] + trailing)
+                    media_rules.setdefault(width, []).append(f"{selector_text} {{{body}}}")
+            return f"{selector}{{{';'.join(declarations)}}}"
+
+        css = CSS_RULE.sub(rewrite_rule, css)
+        # Narrower screens get narrower variants; later (smaller) queries win
+        for width in sorted(media_rules, reverse=True):
+            css += f"\n@media (max-width: {width}px) {{\n    " + "\n    ".join(media_rules[width]) + "\n}\n"
+        return css
+
+    def build(self) -> dict:
+        if os.path.isdir(self.build_dir):
+            shutil.rmtree(self.build_dir)
+        sources = self.sources()
+
+        # Images first, then stylesheets that reference them, then everything else
+        def order(path):
+            ext = os.path.splitext(path)[1]
+            return (0 if ext in RASTER_EXTENSIONS else 1 if ext == ".css" else 2, path)
+
+        for path in sorted(sources, key=order):
+            with open(os.path.join(self.static_dir, path), "rb") as f:
+                data = f.read()
+            ext = os.path.splitext(path)[1]
+            if ext in RASTER_EXTENSIONS:
+                self.build_image(path, data)
+            elif ext == ".css":
+                self.add(path, self.rewrite_css(data.decode("utf-8")).encode("utf-8"))
+            else:
+                self.add(path, data)
+
+        manifest = {"files": self.files, "variants": self.variants}
+        with open(os.path.join(self.build_dir, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--static-dir", default=STATIC_DIR)
+    parser.add_argument("--strict", action="store_true", help="fail if an image encoder is unavailable")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    manifest = AssetBuilder(args.static_dir, strict=args.strict).build()
+    for source, built in sorted(manifest["files"].items()):
+        logger.info("%s -> %s", source, built)
+    for source, variants in sorted(manifest["variants"].items()):
+        for variant in variants:
+            logger.info("%s -> %s (%d bytes)", source, variant["path"], variant["bytes"])
+
+
+if __name__ == "__main__":
+    main()
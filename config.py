@@ -9,11 +9,108 @@ ALPACA_API_KEY = os.getenv('ALPACA_API_KEY')
 ALPACA_API_SECRET = os.getenv('ALPACA_API_SECRET')
 ALPACA_BASE_URL = os.getenv('ALPACA_BASE_URL')
 
+# Alpaca HTTP client tuning
+ALPACA_CONNECT_TIMEOUT = float(os.getenv('ALPACA_CONNECT_TIMEOUT', '3'))
+ALPACA_READ_TIMEOUT = float(os.getenv('ALPACA_READ_TIMEOUT', '10'))
+ALPACA_MAX_RETRIES = int(os.getenv('ALPACA_MAX_RETRIES', '3'))
+ALPACA_POOL_SIZE = int(os.getenv('ALPACA_POOL_SIZE', '20'))
+
+# Application database and connection pool
+DATABASE_PATH = os.getenv('DATABASE_PATH', 'app.db')
+DB_READERS = int(os.getenv('DB_READERS', '4'))
+DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', str(64 * 1024 * 1024)))
+DB_CACHE_SIZE_KIB = int(os.getenv('DB_CACHE_SIZE_KIB', str(16 * 1024)))
+
+# SQLite file holding the locally stored daily bars
+BAR_STORE_PATH = os.getenv('BAR_STORE_PATH', 'market_data.db')
+
+# Start of the daily SPY history synced for the backtests (SPY listed 1993-01-29;
+# Alpaca returns bars from wherever its own history begins)
+BACKTEST_HISTORY_START = os.getenv('BACKTEST_HISTORY_START', '1993-01-29')
+
+# /bars: symbols per call, symbols per upstream request, concurrent upstream requests
+BARS_MAX_SYMBOLS = int(os.getenv('BARS_MAX_SYMBOLS', '10'))
+BARS_SYMBOLS_PER_REQUEST = int(os.getenv('BARS_SYMBOLS_PER_REQUEST', '5'))
+BARS_MAX_CONCURRENCY = int(os.getenv('BARS_MAX_CONCURRENCY', '4'))
+
+# Monte Carlo projection engine
+MONTE_CARLO_WORKERS = int(os.getenv('MONTE_CARLO_WORKERS', '0')) or None  # default: one per core
+MONTE_CARLO_CHUNK_PATHS = int(os.getenv('MONTE_CARLO_CHUNK_PATHS', '10000'))
+MONTE_CARLO_PARALLEL_THRESHOLD = int(os.getenv('MONTE_CARLO_PARALLEL_THRESHOLD', '20000'))
+MONTE_CARLO_CACHE_SIZE = int(os.getenv('MONTE_CARLO_CACHE_SIZE', '64'))
+# /sip-montecarlo is public: cap the paths per request and the simulations running at once
+MONTE_CARLO_MAX_PATHS = int(os.getenv('MONTE_CARLO_MAX_PATHS', '10000'))
+MONTE_CARLO_MAX_CONCURRENCY = int(os.getenv('MONTE_CARLO_MAX_CONCURRENCY', '2'))
+
+# Minutes after the market close before the day's bar is treated as final
+MARKET_DATA_SETTLE_MINUTES = int(os.getenv('MARKET_DATA_SETTLE_MINUTES', '20'))
+
+# Group commit for /increment-interest and /subscribe
+WRITE_BATCH_SIZE = int(os.getenv('WRITE_BATCH_SIZE', '500'))
+WRITE_BATCH_DELAY_MS = float(os.getenv('WRITE_BATCH_DELAY_MS', '5'))
+
+# Background database backups
+BACKUP_DIR = os.getenv('BACKUP_DIR', 'backups')
+BACKUP_INTERVAL_SECONDS = float(os.getenv('BACKUP_INTERVAL_SECONDS', '3600'))
+BACKUP_CHANGE_THRESHOLD = int(os.getenv('BACKUP_CHANGE_THRESHOLD', '1000'))
+BACKUP_KEEP = int(os.getenv('BACKUP_KEEP', '5'))
+BACKUP_COMPRESS = os.getenv('BACKUP_COMPRESS', 'false').lower() in ('1', 'true', 'yes')
+
+# WebSocket interest-count fan-out
+BROADCAST_INTERVAL_MS = float(os.getenv('BROADCAST_INTERVAL_MS', '100'))
+BROADCAST_QUEUE_SIZE = int(os.getenv('BROADCAST_QUEUE_SIZE', '8'))
+BROADCAST_SEND_TIMEOUT = float(os.getenv('BROADCAST_SEND_TIMEOUT', '5'))
+
+# Pub/sub for count updates: 'memory' (single worker) or 'sqlite' (multiple uvicorn workers)
+PUBSUB_BACKEND = os.getenv('PUBSUB_BACKEND', 'memory')
+PUBSUB_POLL_INTERVAL_MS = float(os.getenv('PUBSUB_POLL_INTERVAL_MS', '100'))
+
+# Rows fetched per batch when streaming admin exports
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '1000'))
+EXPORT_MAX_PAGE_SIZE = int(os.getenv('EXPORT_MAX_PAGE_SIZE', '10000'))
+# Export downloads in flight; each holds its own SQLite connection until the client finishes
+EXPORT_MAX_STREAMS = int(os.getenv('EXPORT_MAX_STREAMS', '4'))
+
+# Admin dashboard Server-Sent Events
+ADMIN_EVENTS_INTERVAL_MS = float(os.getenv('ADMIN_EVENTS_INTERVAL_MS', '250'))
+ADMIN_EVENTS_HEARTBEAT_SECONDS = float(os.getenv('ADMIN_EVENTS_HEARTBEAT_SECONDS', '15'))
+
+# Logging: DEBUG enables per-request diagnostics
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+
+# Response compression (brotli is used when the optional package is installed)
+COMPRESSION_MINIMUM_SIZE = int(os.getenv('COMPRESSION_MINIMUM_SIZE', '500'))
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '4'))
+
+# Startup: time from importing app.py to accepting traffic (warned about when exceeded)
+STARTUP_BUDGET_MS = float(os.getenv('STARTUP_BUDGET_MS', '500'))
+
+# Write endpoint limits: per-client token bucket (rate per second, burst; rate 0
+# disables it) and requests in flight per route (0 disables)
+INTEREST_RATE_PER_SECOND = float(os.getenv('INTEREST_RATE_PER_SECOND', '5'))
+INTEREST_BURST = float(os.getenv('INTEREST_BURST', '20'))
+INTEREST_MAX_CONCURRENCY = int(os.getenv('INTEREST_MAX_CONCURRENCY', '512'))
+SUBSCRIBE_RATE_PER_SECOND = float(os.getenv('SUBSCRIBE_RATE_PER_SECOND', '0.1'))
+SUBSCRIBE_BURST = float(os.getenv('SUBSCRIBE_BURST', '5'))
+SUBSCRIBE_MAX_CONCURRENCY = int(os.getenv('SUBSCRIBE_MAX_CONCURRENCY', '64'))
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv('RATE_LIMIT_MAX_CLIENTS', '100000'))
+
+# Cold archive: interest_data rows older than ARCHIVE_AFTER_DAYS (whole UTC days)
+# move to compressed Parquet under ARCHIVE_DIR; 0 disables archiving
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'archive')
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '90'))
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv('ARCHIVE_INTERVAL_SECONDS', '3600'))
+ARCHIVE_COMPRESSION = os.getenv('ARCHIVE_COMPRESSION', 'zstd')
+
 # Application Configuration
 APP_NAME = os.getenv('APP_NAME', 'Collective Auto Investment')
 APP_DESCRIPTION = os.getenv('APP_DESCRIPTION', 'A web application that helps users understand the power of systematic investment in the S&P 500 index.')
 APP_EMAIL = os.getenv('APP_EMAIL', 'ask.the.vault.1a@gmail.com')
 
-# Validate required environment variables
-if not all([ALPACA_API_KEY, ALPACA_API_SECRET, ALPACA_BASE_URL]):
-    raise ValueError("Missing required environment variables. Please check your .env file.") 
\ No newline at end of file
+# Required environment variables; checked when the app starts, not on import
+REQUIRED_SETTINGS = ('ALPACA_API_KEY', 'ALPACA_API_SECRET', 'ALPACA_BASE_URL')
+
+def missing_settings():
+    """Names of required environment variables that are not set"""
+    return [name for name in REQUIRED_SETTINGS if not globals()[name]]
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List
+
+from metrics import DB_QUERY_LATENCY, query_name
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStats:
+    """Acquisition counts and wait times for one side of the pool"""
+
+    def __init__(self):
+        self.acquisitions = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, waited: float):
+        self.acquisitions += 1
+        self.total_wait += waited
+        if waited > self.max_wait:
+            self.max_wait = waited
+
+    def as_dict(self) -> dict:
+        return {
+            "acquisitions": self.acquisitions,
+            "total_wait_ms": round(self.total_wait * 1000, 3),
+            "avg_wait_ms": round(self.total_wait * 1000 / self.acquisitions, 3) if self.acquisitions else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+        }
+
+
+class Database:
+    """SQLite access layer: a pool of reader connections plus one writer.
+
+    The database runs in WAL mode so readers never block on the writer.
+    Work is passed in as a function of a connection and executed on a
+    worker thread, so the event loop never waits on disk I/O:
+
+        count = await db.read(lambda conn: conn.execute(...).fetchone()[0])
+
+    `write()` commits when the function returns and rolls back if it raises.
+    The `run_*` variants are the blocking equivalents for code that already
+    runs on a worker thread.
+    """
+
+    def __init__(self, path: str, readers: int = 4, mmap_size: int = 64 * 1024 * 1024,
+                 cache_size_kib: int = 16 * 1024, busy_timeout_ms: int = 5000):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.readers = readers
+        self.mmap_size = mmap_size
+        self.cache_size_kib = cache_size_kib
+        self.busy_timeout_ms = busy_timeout_ms
+        self._reader_pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._reader_count = 0
+        self._reader_lock = threading.Lock()
+        self._streams_open = 0
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self.read_stats = PoolStats()
+        self.write_stats = PoolStats()
+
+    def _connect(self, read_only: bool = False) -> sqlite3.Connection:
+        # Connections are handed between worker threads but never used by two at once
+        target, uri = (f"file:{self.path}?mode=ro", True) if read_only else (self.path, False)
+        conn = sqlite3.connect(target, check_same_thread=False, timeout=self.busy_timeout_ms / 1000, uri=uri)
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout_ms)}')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute(f'PRAGMA mmap_size = {int(self.mmap_size)}')
+        conn.execute(f'PRAGMA cache_size = {-int(self.cache_size_kib)}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        return conn
+
+    def _writer_connection(self) -> sqlite3.Connection:
+        if self._writer is None:
+            self._writer = self._connect()
+            # Only takes effect on a new file: freed pages can then be returned in small steps
+            # (PRAGMA incremental_vacuum) instead of a VACUUM that holds the writer throughout
+            self._writer.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            # WAL is persistent in the file; readers no longer block on the writer
+            self._writer.execute('PRAGMA journal_mode = WAL')
+        return self._writer
+
+    @contextmanager
+    def reader(self):
+        """Borrow a reader connection, opening up to `readers` lazily"""
+        started = time.perf_counter()
+        try:
+            conn = self._reader_pool.get_nowait()
+        except queue.Empty:
+            with self._reader_lock:
+                can_open = self._reader_count < self.readers
+                if can_open:
+                    self._reader_count += 1
+            conn = self._connect() if can_open else self._reader_pool.get()
+        self.read_stats.record(time.perf_counter() - started)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._reader_pool.put(conn)
+
+    @contextmanager
+    def writer(self):
+        """Hold the single writer connection; commits on success"""
+        started = time.perf_counter()
+        with self._writer_lock:
+            self.write_stats.record(time.perf_counter() - started)
+            conn = self._writer_connection()
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    def run_read(self, fn: Callable[..., Any], *args) -> Any:
+        with self.reader() as conn:
+            with DB_QUERY_LATENCY.time(db=self.name, mode="read", query=query_name(fn)):
+                return fn(conn, *args)
+
+    def run_write(self, fn: Callable[..., Any], *args) -> Any:
+        with self.writer() as conn:
+            with DB_QUERY_LATENCY.time(db=self.name, mode="write", query=query_name(fn)):
+                return fn(conn, *args)
+
+    def iter_batches(self, sql: str, params: tuple = (), batch_size: int = 1000) -> Iterator[List[tuple]]:
+        """Yield a query's rows in `fetchmany` batches (blocking).
+
+        Streams are paced by their consumer (an export download can take
+        minutes), so each one gets its own read-only connection instead of
+        holding a pooled reader; its read snapshot lasts until the generator
+        is exhausted or closed.
+        """
+        conn = self._connect(read_only=True)
+        with self._reader_lock:
+            self._streams_open += 1
+        try:
+            cursor = conn.execute(sql, params)
+            while True:
+                with DB_QUERY_LATENCY.time(db=self.name, mode="read", query="iter_batches"):
+                    rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            conn.close()
+            with self._reader_lock:
+                self._streams_open -= 1
+
+    async def read(self, fn: Callable[..., Any], *args) -> Any:
+        return await asyncio.to_thread(self.run_read, fn, *args)
+
+    async def write(self, fn: Callable[..., Any], *args) -> Any:
+        return await asyncio.to_thread(self.run_write, fn, *args)
+
+    def close(self):
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        while True:
+            try:
+                self._reader_pool.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._reader_lock:
+            self._reader_count = 0
+
+    def stats(self) -> dict:
+        return {
+            "readers_open": self._reader_count,
+            "readers_idle": self._reader_pool.qsize(),
+            "streams_open": self._streams_open,
+            "read": self.read_stats.as_dict(),
+            "write": self.write_stats.as_dict(),
+        }
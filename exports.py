@@ -0,0 +1,267 @@
+import csv
+import io
+import itertools
+import json
+import zlib
+from datetime import datetime, timezone
+from typing import Callable, Generator, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from starlette.responses import StreamingResponse
+
+
+class ExportTable(NamedTuple):
+    name: str
+    column: str
+    header: str
+    title: str
+    json_key: str
+
+
+EXPORT_TABLES = {
+    "interest_data": ExportTable("interest_data", "ip_address", "IP Address", "Interest Data", "interest_data"),
+    "email_subscribers": ExportTable("email_subscribers", "email", "Email", "Subscriber Data", "email_data"),
+}
+
+# A section is a table plus a lazy source of (id, value, timestamp) row batches
+Section = Tuple[ExportTable, Iterable[List[tuple]]]
+
+
+def parse_since(value: Optional[str]) -> Optional[str]:
+    """Normalise a `since=` filter to SQLite's stored timestamp format"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid since timestamp: {value!r} (expected ISO 8601, e.g. 2024-01-31T12:00:00)")
+    # Stored timestamps are naive UTC (CURRENT_TIMESTAMP)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def select_rows(table: ExportTable, since: Optional[str] = None, after_id: Optional[int] = None,
+                limit: Optional[int] = None) -> Tuple[str, tuple]:
+    """Build the export query for one table.
+
+    Full exports go newest first; keyset pages (`after_id`/`limit`) go in id
+    order so the last id of a page is the cursor for the next one. Both
+    orders walk the primary key, so nothing is sorted before the first row.
+    """
+    sql = f"SELECT id, {table.column}, timestamp FROM {table.name}"
+    where, params = [], []
+    if since is not None:
+        where.append("timestamp >= ?")
+        params.append(since)
+    if after_id is not None:
+        where.append("id > ?")
+        params.append(after_id)
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if after_id is None and limit is None:
+        sql += " ORDER BY id DESC"
+    else:
+        sql += " ORDER BY id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return sql, tuple(params)
+
+
+def with_archive(hot_batches: Generator[List[tuple], None, None], archive, since: Optional[str] = None,
+                 after_id: Optional[int] = None, limit: Optional[int] = None) -> Iterator[List[tuple]]:
+    """Chain an archived table's Parquet rows with its hot rows, in export order.
+
+    Archived ids are all lower than hot ones, so full exports (newest first)
+    continue into the archive and keyset pages start in it. The first hot
+    batch is fetched before the archive is listed, which pins the read
+    snapshot: rows archived after that are skipped by id, so an archival run
+    during the export neither drops nor repeats a row.
+    """
+    try:
+        first = next(hot_batches, [])
+        if after_id is None and limit is None:
+            lowest = None
+            for rows in itertools.chain([first], hot_batches):
+                if rows:
+                    lowest = rows[-1][0]
+                    yield rows
+            yield from archive.iter_batches(since, before_id=lowest, descending=True)
+            return
+
+        remaining = limit
+        for rows in itertools.chain(
+            archive.iter_batches(since, after_id, before_id=first[0][0] if first else None),
+            [first],
+            hot_batches,
+        ):
+            if remaining is not None:
+                rows = rows[:remaining]
+                remaining -= len(rows)
+            if rows:
+                yield rows
+            if remaining == 0:
+                return
+    finally:
+        hot_batches.close()
+
+
+def row_dict(table: ExportTable, row: tuple, with_id: bool = True) -> dict:
+    row_id, value, timestamp = row
+    if with_id:
+        return {"id": row_id, table.column: value, "timestamp": timestamp}
+    return {table.column: value, "timestamp": timestamp}
+
+
+def csv_export(sections: Iterable[Section]) -> Iterator[str]:
+    """Titled CSV sections, one chunk per fetched batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+
+    def drain() -> str:
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+    for index, (table, batches) in enumerate(sections):
+        if index:
+            writer.writerow([])
+        writer.writerow([table.title])
+        writer.writerow([table.header, "Timestamp"])
+        yield drain()
+        for rows in batches:
+            writer.writerows((value, timestamp) for _, value, timestamp in rows)
+            yield drain()
+
+
+def ndjson_export(sections: Iterable[Section], page_size: Optional[int] = None) -> Iterator[str]:
+    """One JSON object per line; paged exports end with a cursor line"""
+    last_id, count = None, 0
+    for table, batches in sections:
+        for rows in batches:
+            lines = []
+            for row in rows:
+                record = row_dict(table, row)
+                record["table"] = table.name
+                lines.append(json.dumps(record))
+            last_id, count = rows[-1][0], count + len(rows)
+            yield "\n".join(lines) + "\n"
+    if page_size is not None:
+        yield json.dumps({"next_after_id": last_id if count >= page_size else None}) + "\n"
+
+
+def _json_array(table: ExportTable, batches: Iterable[List[tuple]], with_id: bool,
+                on_batch: Optional[Callable[[List[tuple]], None]] = None) -> Iterator[str]:
+    yield "["
+    separator = ""
+    for rows in batches:
+        if on_batch is not None:
+            on_batch(rows)
+        yield separator + ", ".join(json.dumps(row_dict(table, row, with_id)) for row in rows)
+        separator = ", "
+    yield "]"
+
+
+def json_export(summary: dict, sections: Iterable[Section]) -> Iterator[str]:
+    """The full `{"summary": ..., "<table>": [...]}` document, streamed"""
+    yield '{"summary": ' + json.dumps(summary)
+    for table, batches in sections:
+        yield f', "{table.json_key}": '
+        yield from _json_array(table, batches, with_id=False)
+    yield "}"
+
+
+def json_page(table: ExportTable, batches: Iterable[List[tuple]], page_size: int) -> Iterator[str]:
+    """One keyset page: `{"table": ..., "rows": [...], "next_after_id": ...}`"""
+    seen = {"last_id": None, "count": 0}
+
+    def track(rows):
+        seen["last_id"] = rows[-1][0]
+        seen["count"] += len(rows)
+
+    yield f'{{"table": "{table.name}", "rows": '
+    yield from _json_array(table, batches, with_id=True, on_batch=track)
+    next_after_id = seen["last_id"] if seen["count"] >= page_size else None
+    yield f', "next_after_id": {json.dumps(next_after_id)}}}'
+
+
+def gzip_stream(chunks: Iterable[str], level: int = 6) -> Iterator[bytes]:
+    """Compress a text stream incrementally into a gzip member"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class ExportStreams:
+    """Caps export downloads in flight.
+
+    Each one holds its own database connection for as long as the client
+    takes to read it, so past `max_streams` new exports are refused rather
+    than queued. Only touched from the event loop, so no locking is needed.
+    """
+
+    def __init__(self, max_streams: int):
+        self.max_streams = max_streams
+        self.open = 0
+        self.refused = 0
+
+    def acquire(self) -> bool:
+        if self.open >= self.max_streams:
+            self.refused += 1
+            return False
+        self.open += 1
+        return True
+
+    def release(self):
+        self.open -= 1
+
+    def stats(self) -> dict:
+        return {"max_streams": self.max_streams, "open": self.open, "refused": self.refused}
+
+
+class _ExportResponse(StreamingResponse):
+    """A StreamingResponse that releases its source however the response ends.
+
+    A client that disconnects mid-download leaves the synchronous generator
+    suspended; closing it here runs its `finally` blocks (closing the
+    database connection) now rather than whenever it is garbage collected.
+    """
+
+    def __init__(self, chunks: Iterable, *args, on_close: Optional[Callable[[], None]] = None, **kwargs):
+        super().__init__(chunks, *args, **kwargs)
+        self.source = chunks
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            close = getattr(self.source, "close", None)
+            if close is not None:
+                close()
+            if self.on_close is not None:
+                self.on_close()
+
+
+def stream_export(chunks: Iterable[str], media_type: str, filename: Optional[str] = None,
+                  compress: bool = False, on_close: Optional[Callable[[], None]] = None) -> StreamingResponse:
+    """Wrap an export generator in a StreamingResponse.
+
+    The generators are synchronous, so Starlette iterates them on its
+    threadpool and the blocking `fetchmany` calls stay off the event loop.
+    With `compress`, the body is a .gz file rather than a transfer encoding.
+    `on_close` runs once the response is finished, failed or abandoned.
+    """
+    headers = {}
+    if compress:
+        chunks = gzip_stream(chunks)
+        media_type = "application/gzip"
+        if filename:
+            filename += ".gz"
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return _ExportResponse(chunks, media_type=media_type, headers=headers, on_close=on_close)
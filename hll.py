@@ -0,0 +1,172 @@
+import hashlib
+import itertools
+import logging
+import math
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# 2**12 one-byte registers: a 4 KiB blob per sketch
+PRECISION = 12
+
+# Relative standard error of an estimate is 1.04 / sqrt(registers): about
+# 1.6% at this precision, so ~95% of estimates fall within 3.3% of the truth.
+STANDARD_ERROR = 1.04 / math.sqrt(1 << PRECISION)
+
+# Sketch keys: one per UTC day plus a running all-time sketch
+ALL_TIME = "all"
+
+_INVERSE_POWERS = [2.0 ** -r for r in range(65)]
+
+
+def day_key(day) -> str:
+    return f"day:{day:%Y-%m-%d}"
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """HyperLogLog distinct-count sketch over 64-bit hashes.
+
+    Sketches of the same precision merge losslessly (register-wise max), so
+    per-day sketches combine into any range of days.
+    """
+
+    def __init__(self, registers: Optional[bytes] = None, precision: int = PRECISION):
+        if registers is not None:
+            precision = len(registers).bit_length() - 1
+        self.precision = precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(1 << precision)
+
+    def add(self, value: str) -> bool:
+        """Add a value; returns True if the sketch changed"""
+        hashed = _hash(value)
+        bits = 64 - self.precision
+        index = hashed >> bits
+        rank = bits - (hashed & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def update(self, values: Iterable[str]) -> bool:
+        changed = False
+        for value in values:
+            changed |= self.add(value)
+        return changed
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(_INVERSE_POWERS[r] for r in self.registers)
+        zeros = self.registers.count(0)
+        # Small-range correction (linear counting); 64-bit hashes need no large-range one
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.registers)
+
+
+def create_hll_schema(cursor, archive=None):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS visitor_sketches
+        (key TEXT PRIMARY KEY,
+         registers BLOB NOT NULL) WITHOUT ROWID
+    ''')
+    if cursor.execute('SELECT 1 FROM visitor_sketches WHERE key = ?', (ALL_TIME,)).fetchone() is None:
+        backfill_sketches(cursor, archive)
+
+
+def _load(cursor, key: str) -> Optional[HyperLogLog]:
+    row = cursor.execute('SELECT registers FROM visitor_sketches WHERE key = ?', (key,)).fetchone()
+    return HyperLogLog(row[0]) if row else None
+
+
+def _save(cursor, key: str, sketch: HyperLogLog):
+    cursor.execute(
+        'INSERT OR REPLACE INTO visitor_sketches (key, registers) VALUES (?, ?)',
+        (key, sketch.to_bytes())
+    )
+
+
+def backfill_sketches(cursor, archive=None):
+    """Build the day and all-time sketches from interest_data and its archive (one-off)"""
+    all_time = HyperLogLog()
+    days = {}
+    rows = cursor.execute('SELECT DISTINCT date(timestamp), ip_address FROM interest_data')
+    if archive is not None:
+        archived = ((timestamp[:10], ip_address) for _, ip_address, timestamp in archive.iter_rows())
+        rows = itertools.chain(rows, archived)
+    for day, ip_address in rows:
+        # Clicks without a peer address are stored with a NULL ip and never counted as visitors
+        if ip_address is None:
+            continue
+        days.setdefault(day, HyperLogLog()).add(ip_address)
+        all_time.add(ip_address)
+    for day, sketch in days.items():
+        _save(cursor, f"day:{day}", sketch)
+    _save(cursor, ALL_TIME, all_time)
+    logger.info("Backfilled visitor sketches for %d days", len(days))
+
+
+def record_visitors(cursor, when: datetime, ips: Iterable[str]):
+    """Fold a batch of visitor IPs into today's and the all-time sketch"""
+    distinct_ips = {ip for ip in ips if ip is not None}
+    if not distinct_ips:
+        return
+    for key in (day_key(when), ALL_TIME):
+        sketch = _load(cursor, key) or HyperLogLog()
+        if sketch.update(distinct_ips):
+            _save(cursor, key, sketch)
+
+
+def estimate_visitors(conn, today) -> dict:
+    """Approximate unique visitors today, over the last 7 days and all time"""
+    cursor = conn.cursor()
+    week = HyperLogLog()
+    today_sketch = None
+    for offset in range(7):
+        sketch = _load(cursor, day_key(today - timedelta(days=offset)))
+        if sketch is None:
+            continue
+        if offset == 0:
+            today_sketch = sketch
+        week.merge(sketch)
+    all_time = _load(cursor, ALL_TIME)
+    return {
+        "today": today_sketch.estimate() if today_sketch else 0,
+        "week": week.estimate(),
+        "all_time": all_time.estimate() if all_time else 0,
+    }
+
+
+def count_distinct(cursor, since: Optional[str] = None, archive=None) -> int:
+    """Exact distinct visitor IPs since a timestamp, across interest_data and its archive"""
+    where, params = ('WHERE timestamp >= ?', (since,)) if since else ('', ())
+    if archive is None or not archive.partitions(since):
+        return cursor.execute(f'SELECT COUNT(DISTINCT ip_address) FROM interest_data {where}', params).fetchone()[0]
+    ips = archive.distinct_ips(since)
+    ips.update(ip for ip, in cursor.execute(f'SELECT DISTINCT ip_address FROM interest_data {where}', params))
+    ips.discard(None)
+    return len(ips)
+
+
+def count_visitors(conn, today, archive=None) -> dict:
+    """Exact unique visitors over the same windows (full scans; for audits)"""
+    cursor = conn.cursor()
+    week_start = today - timedelta(days=6)
+    return {
+        "today": count_distinct(cursor, f"{today:%Y-%m-%d} 00:00:00", archive),
+        "week": count_distinct(cursor, f"{week_start:%Y-%m-%d} 00:00:00", archive),
+        "all_time": count_distinct(cursor, archive=archive),
+    }
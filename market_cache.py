@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+# US equity market session (regular hours only, exchange holidays are ignored;
+# a refresh on a holiday simply returns the same bars again)
+MARKET_TZ = ZoneInfo("America/New_York")
+MARKET_CLOSE_HOUR = 16
+
+
+def _session_close(day: datetime, settle_delay: timedelta) -> datetime:
+    """Return the moment a session's daily bar is considered final"""
+    close = day.replace(hour=MARKET_CLOSE_HOUR, minute=0, second=0, microsecond=0)
+    return close + settle_delay
+
+
+def next_settlement(now: datetime, settle_delay: timedelta) -> datetime:
+    """Return the next time a new daily bar becomes available after `now`"""
+    now = now.astimezone(MARKET_TZ)
+    day = now
+    while True:
+        if day.weekday() < 5:
+            settled = _session_close(day, settle_delay)
+            if settled > now:
+                return settled
+        day = (day + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def last_settled_session(now: datetime, settle_delay: timedelta) -> datetime:
+    """Return the date of the most recent session whose daily bar is final"""
+    now = now.astimezone(MARKET_TZ)
+    day = now
+    while True:
+        if day.weekday() < 5 and _session_close(day, settle_delay) <= now:
+            return day.replace(hour=0, minute=0, second=0, microsecond=0)
+        day = (day - timedelta(days=1)).replace(hour=23, minute=59, second=59, microsecond=0)
+
+
+class StaleWhileRevalidateCache:
+    """Single-value cache that serves stale data while one background refresh runs.
+
+    `loader` is an async callable producing the value and `expiry` maps the
+    fetch time to the wall-clock timestamp at which the value goes stale.
+    Concurrent misses share a single in-flight load (single-flight), and a
+    failed background refresh keeps serving the stale value, retrying after
+    `retry_after` seconds.
+    """
+
+    def __init__(self, loader, expiry, retry_after: float = 60.0):
+        self._loader = loader
+        self._expiry = expiry
+        self._retry_after = retry_after
+        self._value = None
+        self._expires_at = 0.0
+        self._inflight = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    async def get(self):
+        if self._value is not None:
+            if time.time() < self._expires_at:
+                self.hits += 1
+                return self._value
+            # Serve the stale value and revalidate in the background
+            self.stale_hits += 1
+            self._start_refresh()
+            return self._value
+
+        self.misses += 1
+        return await asyncio.shield(self._start_refresh())
+
+    def prime(self, value, expires_at: float = 0.0):
+        """Seed an empty cache, e.g. from disk at startup; expired values revalidate on first read.
+
+        A value already loaded (say by a request that beat the warmup) is kept.
+        """
+        if self._value is not None:
+            return
+        self._value = value
+        self._expires_at = expires_at
+
+    def invalidate(self):
+        self._expires_at = 0.0
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._inflight is None:
+            self._inflight = asyncio.get_running_loop().create_task(self._refresh())
+        return self._inflight
+
+    async def _refresh(self):
+        self.refreshes += 1
+        try:
+            value = await self._loader()
+        except Exception:
+            self.refresh_failures += 1
+            if self._value is not None:
+                logger.exception("Background refresh failed, serving stale data")
+                self._expires_at = time.time() + self._retry_after
+                return self._value
+            raise
+        finally:
+            self._inflight = None
+
+        self._value = value
+        self._expires_at = self._expiry(datetime.now(MARKET_TZ)).timestamp()
+        return value
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "expires_at": self._expires_at or None,
+            "refresh_in_progress": self._inflight is not None,
+        }
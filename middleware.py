@@ -0,0 +1,177 @@
+import zlib
+from typing import Iterable, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is used when it is missing
+    brotli = None
+
+Headers = List[Tuple[bytes, bytes]]
+
+SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+    "Content-Security-Policy": "upgrade-insecure-requests",
+}
+
+# Content types worth compressing; images, archives and event streams are left alone
+COMPRESSIBLE_TYPES = (
+    b"text/html", b"text/css", b"text/plain", b"text/csv", b"text/javascript",
+    b"application/json", b"application/javascript", b"application/x-ndjson",
+    b"application/xml", b"image/svg+xml",
+)
+
+
+class SecurityHeadersMiddleware:
+    """Add fixed security headers to every HTTP response.
+
+    The headers are encoded once; each response only has them appended to
+    its start message, and the body passes through untouched.
+    """
+
+    def __init__(self, app: ASGIApp, headers: Optional[dict] = None):
+        self.app = app
+        headers = headers or SECURITY_HEADERS
+        self.raw_headers: Headers = [(name.lower().encode("latin-1"), value.encode("latin-1"))
+                                     for name, value in headers.items()]
+        self.names = {name for name, _ in self.raw_headers}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                headers = [(k, v) for k, v in message.get("headers", []) if k.lower() not in self.names]
+                message["headers"] = headers + self.raw_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+def negotiate_encoding(accept_encoding: str, available: Iterable[str]) -> Optional[str]:
+    """Pick the best of `available` (in preference order) allowed by Accept-Encoding"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token.strip().lower()] = quality
+    for encoding in available:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > 0:
+            return encoding
+    return None
+
+
+class _Encoder:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+            self.compress = self._compressor.process
+            self.flush = self._compressor.flush
+            self.finish = self._compressor.finish
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+            self.compress = self._compressor.compress
+            self.flush = lambda: self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self.finish = self._compressor.flush
+
+
+class CompressionMiddleware:
+    """Negotiated brotli/gzip response compression.
+
+    Complete bodies smaller than `minimum_size` are sent as-is. Streaming
+    bodies are compressed chunk by chunk and flushed after each one, so a
+    StreamingResponse is never buffered. Responses that already carry a
+    Content-Encoding, or whose type is not textual, pass through.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 500, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.encodings = ("br", "gzip") if brotli is not None else ("gzip",)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = negotiate_encoding(accept_encoding, self.encodings) if accept_encoding else None
+
+        start: Optional[Message] = None
+        encoder: Optional[_Encoder] = None
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start, encoder, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                headers = message.get("headers", [])
+                content_type = next((v for k, v in headers if k == b"content-type"), b"")
+                compressible = content_type.split(b";")[0].strip() in COMPRESSIBLE_TYPES
+                if compressible and not any(k == b"vary" and b"accept-encoding" in v.lower() for k, v in headers):
+                    # Caches must key on the negotiated encoding
+                    message["headers"] = headers + [(b"vary", b"Accept-Encoding")]
+                passthrough = (
+                    encoding is None
+                    or not compressible
+                    or message["status"] < 200
+                    or message["status"] in (204, 304)
+                    or any(k == b"content-encoding" for k, _ in headers)
+                )
+                if passthrough:
+                    await send(message)
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                if not more_body and len(body) < self.minimum_size:
+                    # Whole body in one message and too small to be worth it
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                encoder = _Encoder(encoding, self.gzip_level, self.brotli_quality)
+                headers = [(k, v) for k, v in start["headers"] if k != b"content-length"]
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+                if not more_body:
+                    compressed = encoder.compress(body) + encoder.finish()
+                    headers.append((b"content-length", str(len(compressed)).encode("latin-1")))
+                    start["headers"] = headers
+                    await send(start)
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                start["headers"] = headers
+                await send(start)
+
+            if more_body:
+                chunk = encoder.compress(body) + encoder.flush()
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": encoder.compress(body) + encoder.finish()})
+
+        await self.app(scope, receive, send_compressed)
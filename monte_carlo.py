@@ -0,0 +1,200 @@
+import asyncio
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from backtest import InsufficientHistory
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Per-chunk quantile summary used to merge chunks; pooling equally weighted
+# chunk summaries keeps the rank error of the merged bands below 1/200
+# (half a percentile point) while each worker only returns a small array
+MERGE_GRID = np.linspace(0.0, 1.0, 201)
+
+# Hard ceiling; the public endpoint allows far fewer (MONTE_CARLO_MAX_PATHS)
+MAX_PATHS = 200_000
+MAX_YEARS = 60
+
+# Resampling a short history over a much longer horizon only repeats the same
+# few months; refuse horizons beyond this multiple of the sample and flag any
+# horizon longer than the sample itself
+MIN_HISTORY_MONTHS = 24
+MAX_HORIZON_RATIO = 4
+
+
+def monthly_returns(series: pd.Series) -> np.ndarray:
+    """Historical month-over-month returns of a month-end close series"""
+    return series.pct_change().dropna().to_numpy(dtype=float)
+
+
+def simulate_chunk(returns: np.ndarray, monthly: float, months: int, paths: int,
+                   seed, quantiles: np.ndarray) -> np.ndarray:
+    """Bootstrap `paths` SIP paths and return their quantiles for every month.
+
+    Memory is O(paths): paths advance one month at a time (vectorised across
+    paths) and only the requested quantiles of each month are kept.
+    """
+    rng = np.random.default_rng(seed)
+    growth = 1.0 + returns
+    values = np.zeros(paths)
+    out = np.empty((months, len(quantiles)))
+
+    # Linear interpolation between order statistics (numpy's default method),
+    # computed from one sort per month instead of a multi-pivot partition
+    positions = quantiles * (paths - 1)
+    lower = np.floor(positions).astype(int)
+    upper = np.minimum(lower + 1, paths - 1)
+    weight = positions - lower
+
+    for month in range(months):
+        values += monthly
+        values *= growth[rng.integers(0, len(growth), size=paths)]
+        ordered = np.sort(values)
+        out[month] = ordered[lower] * (1.0 - weight) + ordered[upper] * weight
+    return out
+
+
+class MonteCarloEngine:
+    """Bootstrap projection of SIP outcomes with percentile bands.
+
+    Large simulations are split into fixed-size chunks spread across a
+    process pool; results are memoised per parameter tuple with LRU eviction.
+    At most `max_concurrency` simulations run at once, and identical requests
+    arriving while one is running share its result.
+    """
+
+    def __init__(self, workers: Optional[int] = None, chunk_paths: int = 10_000,
+                 parallel_threshold: int = 20_000, cache_size: int = 64,
+                 max_paths: int = MAX_PATHS, max_concurrency: int = 2):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_paths = chunk_paths
+        self.parallel_threshold = parallel_threshold
+        self.cache_size = cache_size
+        self.max_paths = min(max_paths, MAX_PATHS)
+        self.max_concurrency = max_concurrency
+        self._cache = OrderedDict()
+        self._inflight: Dict[tuple, asyncio.Task] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.coalesced = 0
+        self.running = 0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn keeps workers independent of the server's threads and sockets
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def project(self, returns: np.ndarray, data_key, monthly: float, years: int,
+                      paths: int, seed: int = 0) -> dict:
+        if len(returns) < MIN_HISTORY_MONTHS:
+            raise InsufficientHistory(
+                f"At least {MIN_HISTORY_MONTHS} months of SPY history are needed to simulate; "
+                f"{len(returns)} are stored so far"
+            )
+        if not 1 <= years <= MAX_YEARS:
+            raise ValueError(f"Years must be between 1 and {MAX_YEARS}")
+        if years * 12 > MAX_HORIZON_RATIO * len(returns):
+            raise ValueError(
+                f"{years} years is more than {MAX_HORIZON_RATIO}x the {len(returns)} months of history "
+                f"available to resample; use at most {MAX_HORIZON_RATIO * len(returns) // 12} years"
+            )
+        if not 1 <= paths <= self.max_paths:
+            raise ValueError(f"Paths must be between 1 and {self.max_paths}")
+        if monthly <= 0:
+            raise ValueError("Monthly amount must be positive")
+
+        key = (data_key, monthly, years, paths, seed)
+        if key in self._cache:
+            self.cache_hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.cache_misses += 1
+            task = asyncio.get_running_loop().create_task(self._run(key, returns, monthly, years, paths, seed))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # A caller that disconnects must not cancel the run for the others waiting on it
+        return await asyncio.shield(task)
+
+    async def _run(self, key: tuple, returns: np.ndarray, monthly: float, years: int,
+                   paths: int, seed: int) -> dict:
+        async with self._semaphore:
+            self.running += 1
+            try:
+                bands = await self._simulate(returns, monthly, years * 12, paths, seed)
+            finally:
+                self.running -= 1
+        result = {
+            "monthly": monthly,
+            "years": years,
+            "paths": paths,
+            "seed": seed,
+            "history_months": len(returns) + 1,
+            # Longer than the sample: every path repeats historical months many times over
+            "extrapolated": years * 12 > len(returns),
+            "total_invested": round(monthly * years * 12, 2),
+            "bands": {
+                f"p{p}": np.round(bands[:, i], 2).tolist() for i, p in enumerate(PERCENTILES)
+            },
+        }
+        result["final"] = {name: values[-1] for name, values in result["bands"].items()}
+
+        self._cache[key] = result
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    async def _simulate(self, returns: np.ndarray, monthly: float, months: int,
+                        paths: int, seed: int) -> np.ndarray:
+        exact = np.array(PERCENTILES) / 100.0
+        if paths <= self.chunk_paths:
+            return await asyncio.to_thread(simulate_chunk, returns, monthly, months, paths, seed, exact)
+
+        # Equal-size chunks with independent streams derived from the seed
+        n_chunks = -(-paths // self.chunk_paths)
+        sizes = [paths // n_chunks + (1 if i < paths % n_chunks else 0) for i in range(n_chunks)]
+        seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+
+        loop = asyncio.get_running_loop()
+        executor = self._pool() if paths >= self.parallel_threshold else None
+        summaries = await asyncio.gather(*[
+            loop.run_in_executor(executor, simulate_chunk, returns, monthly, months, size, chunk_seed, MERGE_GRID)
+            for size, chunk_seed in zip(sizes, seeds)
+        ])
+
+        # Pool the per-chunk quantile grids and read the bands off the merge
+        pooled = np.concatenate(summaries, axis=1)
+        return np.quantile(pooled, exact, axis=1).T
+
+    def stats(self) -> dict:
+        return {
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cached_results": len(self._cache),
+            "coalesced": self.coalesced,
+            "running": self.running,
+            "queued": len(self._inflight) - self.running,
+            "max_paths": self.max_paths,
+            "workers": self.workers,
+        }
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import sqlite3
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Event types carried on the bus
+INTEREST_COUNT = "interest_count"
+SUBSCRIBER_COUNT = "subscriber_count"
+
+# counters table row behind each count event
+COUNTER_EVENTS = {
+    "interest_data": INTEREST_COUNT,
+    "email_subscribers": SUBSCRIBER_COUNT,
+}
+
+
+class PubSub:
+    """Count-update bus between the write path and the broadcasters.
+
+    Events are small dicts such as {"type": "interest_count", "count": 42};
+    handlers are plain callables run on the event loop.
+    """
+
+    def __init__(self):
+        self._handlers: List[Callable[[dict], None]] = []
+
+    def subscribe(self, handler: Callable[[dict], None]):
+        self._handlers.append(handler)
+
+    def _deliver(self, event: dict):
+        for handler in self._handlers:
+            try:
+                handler(event)
+            except Exception:
+                logger.exception("Pub/sub handler failed for %s", event.get("type"))
+
+    def publish(self, event: dict):
+        self._deliver(event)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": type(self).__name__, "handlers": len(self._handlers)}
+
+
+class InProcessPubSub(PubSub):
+    """Delivers events to handlers in this process only (single worker)"""
+
+
+class SQLitePubSub(PubSub):
+    """Cross-process bus built on the shared SQLite database.
+
+    Local events are delivered immediately. A poller also watches
+    `PRAGMA data_version`, which changes whenever another connection (in any
+    process) commits, and re-reads the counters table on change, so every
+    worker relays updates committed by its siblings to its own sockets.
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.1):
+        super().__init__()
+        self.path = path
+        self.poll_interval = poll_interval
+        self._conn: Optional[sqlite3.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        self._data_version = None
+        self._counts = {}
+        self.polls = 0
+        self.remote_updates = 0
+
+    def _poll(self) -> List[dict]:
+        data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+        if data_version == self._data_version:
+            return []
+        self._data_version = data_version
+
+        events = []
+        for name, value in self._conn.execute('SELECT name, value FROM counters'):
+            event_type = COUNTER_EVENTS.get(name)
+            if event_type is None or self._counts.get(name) == value:
+                continue
+            self._counts[name] = value
+            events.append({"type": event_type, "count": value})
+        return events
+
+    async def _run(self):
+        while True:
+            try:
+                events = await asyncio.to_thread(self._poll)
+                self.polls += 1
+                for event in events:
+                    self.remote_updates += 1
+                    self._deliver(event)
+            except Exception:
+                logger.exception("Pub/sub poll failed")
+            await asyncio.sleep(self.poll_interval)
+
+    async def start(self):
+        if self._task is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats.update(polls=self.polls, remote_updates=self.remote_updates)
+        return stats
+
+
+def create_pubsub(backend: str, path: str, poll_interval: float = 0.1) -> PubSub:
+    if backend == "memory":
+        return InProcessPubSub()
+    if backend == "sqlite":
+        return SQLitePubSub(path, poll_interval)
+    raise ValueError(f"Unknown pub/sub backend: {backend}")
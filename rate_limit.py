@@ -0,0 +1,142 @@
+import json
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from metrics import REQUESTS_SHED
+
+# Requests without a peer address (unix sockets, some test clients) share one bucket
+UNKNOWN_CLIENT = "unknown"
+
+
+class RouteLimit(NamedTuple):
+    rate: float          # tokens added per second per client; 0 disables the per-client limit
+    burst: float         # bucket size, i.e. requests a client may make back to back
+    max_concurrency: int  # requests in flight on this route across all clients; 0 disables
+
+
+class TokenBuckets:
+    """Per-key token buckets in an LRU map bounded to `max_keys` entries.
+
+    Evicting the least recently seen key forgets its bucket, which only
+    ever errs towards allowing a request.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # key -> [tokens, last refill time]
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def take(self, key: str, now: float) -> float:
+        """Take one token; returns 0 if allowed, otherwise seconds until one is available"""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / self.rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class _Route:
+    def __init__(self, path: str, limit: RouteLimit, max_clients: int):
+        self.path = path
+        self.limit = limit
+        self.buckets = TokenBuckets(limit.rate, limit.burst, max_clients) if limit.rate > 0 else None
+        self.in_flight = 0
+        self.allowed = 0
+        self.rate_limited = 0
+        self.over_capacity = 0
+
+    def stats(self) -> dict:
+        return {
+            "rate_per_second": self.limit.rate,
+            "burst": self.limit.burst,
+            "max_concurrency": self.limit.max_concurrency,
+            "in_flight": self.in_flight,
+            "tracked_clients": len(self.buckets) if self.buckets is not None else 0,
+            "allowed": self.allowed,
+            "rate_limited": self.rate_limited,
+            "over_capacity": self.over_capacity,
+        }
+
+
+class RateLimiter:
+    """Limits per (method, path); shared by the middleware and the stats endpoint"""
+
+    def __init__(self, limits: Dict[Tuple[str, str], RouteLimit], max_clients: int = 100_000):
+        self.routes = {key: _Route(key[1], limit, max_clients) for key, limit in limits.items()}
+
+    def stats(self) -> dict:
+        return {route.path: route.stats() for route in self.routes.values()}
+
+
+class RateLimitMiddleware:
+    """Per-client token buckets and per-route concurrency caps, checked before routing.
+
+    A rejected request gets an immediate 429 with Retry-After and never
+    reaches the handler, so abuse costs no database work. Everything runs on
+    the event loop thread, so the counters need no locking.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = self.limiter.routes.get((scope["method"], scope["path"]))
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        if route.limit.max_concurrency and route.in_flight >= route.limit.max_concurrency:
+            route.over_capacity += 1
+            REQUESTS_SHED.inc(route=route.path, reason="concurrency")
+            await self._reject(send, 1, "Server is busy, please retry shortly")
+            return
+        if route.buckets is not None:
+            client = scope.get("client")
+            wait = route.buckets.take(client[0] if client else UNKNOWN_CLIENT, time.monotonic())
+            if wait:
+                route.rate_limited += 1
+                REQUESTS_SHED.inc(route=route.path, reason="rate")
+                await self._reject(send, wait, "Too many requests, please slow down")
+                return
+
+        route.allowed += 1
+        route.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route.in_flight -= 1
+
+    @staticmethod
+    async def _reject(send: Send, retry_after: float, detail: str):
+        body = json.dumps({"detail": detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
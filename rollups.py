@@ -0,0 +1,150 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bucket start formats; the same strings work in Python and in SQLite's strftime()
+BUCKETS = {
+    "minute": "%Y-%m-%d %H:%M:00",
+    "hour": "%Y-%m-%d %H:00:00",
+    "day": "%Y-%m-%d 00:00:00",
+}
+
+# Default look-back per bucket when no `from` is given
+DEFAULT_SPAN = {
+    "minute": timedelta(hours=2),
+    "hour": timedelta(days=7),
+    "day": timedelta(days=365),
+}
+
+# Rolled-up metric -> (raw table, distinct column or None)
+METRICS = {
+    "interest": ("interest_data", "ip_address"),
+    "subscribers": ("email_subscribers", None),
+}
+
+MAX_POINTS = 5000
+
+# Raw rows store naive UTC timestamps ('YYYY-MM-DD HH:MM:SS')
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+
+def create_rollup_schema(cursor, archive=None):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rollups
+        (metric TEXT NOT NULL,
+         bucket TEXT NOT NULL,
+         start TEXT NOT NULL,
+         count INTEGER NOT NULL,
+         unique_ips INTEGER NOT NULL DEFAULT 0,
+         PRIMARY KEY (metric, bucket, start)) WITHOUT ROWID
+    ''')
+    # IPs already counted in each still-open bucket; closed buckets are pruned
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rollup_members
+        (bucket TEXT NOT NULL,
+         start TEXT NOT NULL,
+         ip_address TEXT NOT NULL,
+         PRIMARY KEY (bucket, start, ip_address)) WITHOUT ROWID
+    ''')
+    if cursor.execute('SELECT 1 FROM rollups LIMIT 1').fetchone() is None:
+        backfill_rollups(cursor, archive)
+
+
+def backfill_rollups(cursor, archive=None):
+    """Build the rollups from the raw tables and the archive (one-off, on first start)"""
+    now = utc_now()
+    for metric, (table, column) in METRICS.items():
+        unique = f'COUNT(DISTINCT {column})' if column else '0'
+        for bucket, fmt in BUCKETS.items():
+            cursor.execute(f'''
+                INSERT INTO rollups (metric, bucket, start, count, unique_ips)
+                SELECT ?, ?, strftime(?, timestamp), COUNT(*), {unique}
+                FROM {table}
+                GROUP BY strftime(?, timestamp)
+            ''', (metric, bucket, fmt, fmt))
+            if column:
+                # Remember who is already counted in the open bucket
+                cursor.execute(f'''
+                    INSERT OR IGNORE INTO rollup_members (bucket, start, ip_address)
+                    SELECT ?, strftime(?, timestamp), {column}
+                    FROM {table}
+                    WHERE timestamp >= ? AND {column} IS NOT NULL
+                ''', (bucket, fmt, now.strftime(fmt)))
+            if archive is not None and archive.table == table:
+                # Archived days are whole, so their buckets never overlap the hot ones
+                cursor.executemany('''
+                    INSERT INTO rollups (metric, bucket, start, count, unique_ips)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (metric, bucket, start) DO UPDATE SET
+                        count = count + excluded.count,
+                        unique_ips = unique_ips + excluded.unique_ips
+                ''', [(metric, bucket, start, count, unique if column else 0)
+                      for start, count, unique in archive.bucket_counts(fmt)])
+    logger.info("Backfilled rollups from raw tables")
+
+
+def record_rollups(cursor, metric: str, when: datetime, count: int, ips: Optional[Iterable[str]] = None):
+    """Add `count` events at `when` to every bucket, inside the caller's transaction"""
+    # A click without a peer address (NULL ip) counts as an event but not as a unique IP
+    distinct_ips = {ip for ip in ips if ip is not None} if ips is not None else None
+    for bucket, fmt in BUCKETS.items():
+        start = when.strftime(fmt)
+        new_unique = 0
+        if distinct_ips:
+            # Closed buckets are final; drop their membership sets
+            cursor.execute('DELETE FROM rollup_members WHERE bucket = ? AND start < ?', (bucket, start))
+            cursor.executemany(
+                'INSERT OR IGNORE INTO rollup_members (bucket, start, ip_address) VALUES (?, ?, ?)',
+                [(bucket, start, ip) for ip in distinct_ips]
+            )
+            new_unique = cursor.rowcount
+        cursor.execute('''
+            INSERT INTO rollups (metric, bucket, start, count, unique_ips)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (metric, bucket, start) DO UPDATE SET
+                count = count + excluded.count,
+                unique_ips = unique_ips + excluded.unique_ips
+        ''', (metric, bucket, start, count, new_unique))
+
+
+def parse_bucket_time(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid timestamp: {value!r} (expected ISO 8601, e.g. 2024-01-31T12:00)")
+
+
+def query_timeseries(conn, metric: str, bucket: str, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None, limit: int = MAX_POINTS) -> List[dict]:
+    """Rolled-up points for one metric, oldest first"""
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of: {', '.join(METRICS)}")
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of: {', '.join(BUCKETS)}")
+    fmt = BUCKETS[bucket]
+    if start is None:
+        start = (end or utc_now()) - DEFAULT_SPAN[bucket]
+    sql = 'SELECT start, count, unique_ips FROM rollups WHERE metric = ? AND bucket = ? AND start >= ?'
+    params = [metric, bucket, start.strftime(fmt)]
+    if end is not None:
+        sql += ' AND start < ?'
+        params.append(end.strftime(fmt))
+    sql += ' ORDER BY start LIMIT ?'
+    params.append(limit)
+
+    with_unique = METRICS[metric][1] is not None
+    points = []
+    for row_start, count, unique_ips in conn.execute(sql, params):
+        point = {"start": row_start, "count": count}
+        if with_unique:
+            point["unique_ips"] = unique_ips
+        points.append(point)
+    return points
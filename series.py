@@ -0,0 +1,102 @@
+import struct
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+EPOCH = date(1970, 1, 1)
+
+# Prices are sent as integer cents in the delta encoding
+PRICE_SCALE = 100
+
+ENCODINGS = ("json", "delta", "binary")
+BINARY_MEDIA_TYPE = "application/octet-stream"
+
+# Fewer points than this cannot keep both ends plus a shape
+MIN_POINTS = 3
+
+
+def lttb(values: Sequence[float], threshold: int) -> List[int]:
+    """Indices kept by Largest-Triangle-Three-Buckets downsampling to `threshold` points.
+
+    x is the point's position, so gaps (weekends, holidays) don't skew the
+    buckets; the first and last points are always kept.
+    """
+    n = len(values)
+    if threshold >= n or threshold < MIN_POINTS:
+        return list(range(n))
+
+    every = (n - 2) / (threshold - 2)
+    kept = [0]
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the triangle's third vertex
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = (next_start + next_end - 1) / 2
+        avg_y = sum(values[next_start:next_end]) / (next_end - next_start)
+
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        ay = values[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((a - avg_x) * (values[j] - ay) - (a - j) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return kept
+
+
+def downsample_columns(columns: Sequence[Sequence[Optional[float]]], max_points: int) -> List[int]:
+    """Shared indices for aligned columns: the union of each column's LTTB picks.
+
+    Every column gets an equal share of `max_points` (at least MIN_POINTS);
+    when that floor overshoots, the union is thinned evenly, so at most
+    `max_points` indices come back. Missing values (None) are skipped within
+    a column.
+    """
+    length = len(columns[0]) if columns else 0
+    if length <= max_points:
+        return list(range(length))
+    share = max(MIN_POINTS, max_points // len(columns))
+    kept = set()
+    for column in columns:
+        present = [i for i, value in enumerate(column) if value is not None]
+        kept.update(present[i] for i in lttb([column[i] for i in present], share))
+    kept = sorted(kept)
+    if len(kept) > max_points:
+        # More columns than max_points // MIN_POINTS: keep both ends and an even spread between
+        step = (len(kept) - 1) / (max_points - 1)
+        kept = [kept[round(i * step)] for i in range(max_points)]
+    return kept
+
+
+def epoch_day(timestamp: str) -> int:
+    return (date.fromisoformat(timestamp[:10]) - EPOCH).days
+
+
+def delta_encode(values: Sequence[int]) -> List[int]:
+    """First value, then differences; decode with a running sum"""
+    return [value - previous for previous, value in zip([0] + list(values[:-1]), values)]
+
+
+def encode_delta(dates: Sequence[str], prices: Sequence[float]) -> Dict:
+    """Epoch days and integer cents, both delta encoded: small integers that gzip well"""
+    return {
+        "encoding": "delta",
+        "price_scale": PRICE_SCALE,
+        "days": delta_encode([epoch_day(t) for t in dates]),
+        "prices": delta_encode([round(price * PRICE_SCALE) for price in prices]),
+    }
+
+
+def encode_binary(dates: Sequence[str], prices: Sequence[float]) -> bytes:
+    """Little-endian uint32 count, then int32 epoch days, then float32 prices"""
+    count = len(prices)
+    return struct.pack(f"<I{count}i{count}f", count, *(epoch_day(t) for t in dates), *prices)
+
+
+def downsample_series(dates: Sequence[str], prices: Sequence[float], max_points: int) -> Tuple[list, list]:
+    kept = lttb(prices, max_points)
+    return [dates[i] for i in kept], [prices[i] for i in kept]
@@ -0,0 +1,56 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Times named startup phases and reports them against a boot budget.
+
+    `started` is taken at the top of app.py. `mark()` records the time since
+    the previous mark (module import, then the server setting up until the
+    lifespan runs) and `ready()` measures everything up to accepting traffic.
+    Background warmup that runs after that is reported separately.
+    """
+
+    def __init__(self, budget_ms: float, started: Optional[float] = None):
+        self.budget_ms = budget_ms
+        self.started = started if started is not None else time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.warmup: Dict[str, float] = {}
+        self.ready_ms: Optional[float] = None
+        self._last_mark = self.started
+
+    def record(self, name: str, seconds: float, warmup: bool = False):
+        (self.warmup if warmup else self.phases)[name] = round(seconds * 1000, 2)
+
+    def mark(self, name: str):
+        now = time.perf_counter()
+        self.record(name, now - self._last_mark)
+        self._last_mark = now
+
+    @contextmanager
+    def phase(self, name: str, warmup: bool = False):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started, warmup)
+
+    def ready(self):
+        self.ready_ms = round((time.perf_counter() - self.started) * 1000, 2)
+        breakdown = " ".join(f"{name}={ms}ms" for name, ms in self.phases.items())
+        if self.ready_ms > self.budget_ms:
+            logger.warning("startup_over_budget ready_ms=%s budget_ms=%s %s", self.ready_ms, self.budget_ms, breakdown)
+        else:
+            logger.info("startup_ready ready_ms=%s budget_ms=%s %s", self.ready_ms, self.budget_ms, breakdown)
+
+    def stats(self) -> dict:
+        return {
+            "budget_ms": self.budget_ms,
+            "ready_ms": self.ready_ms,
+            "phases": dict(self.phases),
+            "warmup": dict(self.warmup),
+        }
@@ -8,46 +8,58 @@ document.addEventListener('DOMContentLoaded', function() {
         return;
     }
 
-    // Fetch admin stats with password
-    fetch('/admin/stats?password=' + encodeURIComponent(password))
-        .then(response => {
-            if (!response.ok) {
-                throw new Error('Network response was not ok');
-            }
-            return response.json();
-        })
-        .then(data => {
-            // Update total interest
-            document.getElementById('totalInterest').textContent = data.total_interest;
-            
-            // Update total subscribers
-            document.getElementById('totalSubscribers').textContent = data.total_subscribers;
-            
-            // Update recent interest
-            const recentInterestHtml = data.recent_interest.map(item => `
-                <div class="glass-effect rounded-lg p-3 flex justify-between items-center">
-                    <span class="text-nyu-purple">Interest recorded</span>
-                    <span class="text-gray-600 text-sm">${formatDate(item.timestamp)}</span>
-                </div>
-            `).join('');
-            document.getElementById('recentInterest').innerHTML = recentInterestHtml || 'No recent interest';
-            
-            // Update recent subscribers
-            const recentSubscribersHtml = data.recent_subscribers.map(item => `
-                <div class="glass-effect rounded-lg p-3 flex justify-between items-center">
-                    <span class="text-nyu-purple">${item.email}</span>
-                    <span class="text-gray-600 text-sm">${formatDate(item.timestamp)}</span>
-                </div>
-            `).join('');
-            document.getElementById('recentSubscribers').innerHTML = recentSubscribersHtml || 'No recent subscribers';
-        })
-        .catch(error => {
-            console.error('Error fetching admin stats:', error);
+    // Live stats: a snapshot first, then deltas pushed on every write.
+    // EventSource reconnects on its own and resumes from the last event id.
+    const recentInterest = [];
+    const recentSubscribers = [];
+    const events = new EventSource('/admin/events?password=' + encodeURIComponent(password));
+
+    function applyUpdate(data, replace) {
+        // Update totals
+        document.getElementById('totalInterest').textContent = data.totals.total_interest;
+        document.getElementById('totalSubscribers').textContent = data.totals.total_subscribers;
+
+        // Keep the newest five rows of each list, newest first
+        if (replace) {
+            recentInterest.length = 0;
+            recentSubscribers.length = 0;
+        }
+        recentInterest.unshift(...data.interest.slice(-5).reverse());
+        recentSubscribers.unshift(...data.subscribers.slice(-5).reverse());
+        recentInterest.splice(5);
+        recentSubscribers.splice(5);
+
+        // Update recent interest
+        const recentInterestHtml = recentInterest.map(item => `
+            <div class="glass-effect rounded-lg p-3 flex justify-between items-center">
+                <span class="text-nyu-purple">Interest recorded</span>
+                <span class="text-gray-600 text-sm">${formatDate(item.timestamp)}</span>
+            </div>
+        `).join('');
+        document.getElementById('recentInterest').innerHTML = recentInterestHtml || 'No recent interest';
+
+        // Update recent subscribers
+        const recentSubscribersHtml = recentSubscribers.map(item => `
+            <div class="glass-effect rounded-lg p-3 flex justify-between items-center">
+                <span class="text-nyu-purple">${item.email}</span>
+                <span class="text-gray-600 text-sm">${formatDate(item.timestamp)}</span>
+            </div>
+        `).join('');
+        document.getElementById('recentSubscribers').innerHTML = recentSubscribersHtml || 'No recent subscribers';
+    }
+
+    events.addEventListener('snapshot', event => applyUpdate(JSON.parse(event.data), true));
+    events.addEventListener('delta', event => applyUpdate(JSON.parse(event.data), false));
+    events.onerror = () => {
+        // Closed for good (e.g. wrong password); otherwise the browser retries
+        if (events.readyState === EventSource.CLOSED) {
+            console.error('Admin event stream closed');
             document.getElementById('totalInterest').textContent = 'Error';
             document.getElementById('totalSubscribers').textContent = 'Error';
             document.getElementById('recentInterest').innerHTML = 'Error loading data';
             document.getElementById('recentSubscribers').innerHTML = 'Error loading data';
-        });
+        }
+    };
 
     // Handle logout
     document.getElementById('logoutBtn')?.addEventListener('click', () => {
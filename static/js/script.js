@@ -42,28 +42,35 @@ function updateSIPProjection(annualReturn) {
     document.getElementById('sip-40year-total').textContent = formatCurrency(fortyYearResult.futureValue);
 }
 
-// Function to format date to month
-function formatDateToMonth(dateString) {
-    const date = new Date(dateString);
-    return date.toLocaleString('default', { month: 'short' });
+// Month names, looked up by index instead of formatting every date
+const MONTH_NAMES = Array.from({ length: 12 }, (_, month) =>
+    new Date(Date.UTC(2000, month, 1)).toLocaleString('default', { month: 'short', timeZone: 'UTC' }));
+
+// Undo the server's delta encoding (first value, then differences)
+function runningSum(deltas) {
+    let total = 0;
+    return deltas.map(delta => (total += delta));
 }
 
 // Function to fetch and display S&P 500 data
 async function fetchSP500Data() {
     try {
-        const response = await fetch('/sp500-data');
+        const ctx = document.getElementById('sp500Chart');
+        const loadingElement = document.getElementById('chart-loading');
+        
+        // About one point per pixel, downsampled server-side with LTTB
+        const maxPoints = Math.max(100, Math.round(ctx.clientWidth || 800));
+        const response = await fetch(`/sp500-data?encoding=delta&max_points=${maxPoints}`);
         const data = await response.json();
         
-        if (!data.dates || !data.prices || data.dates.length === 0) {
+        if (!data.days || !data.prices || data.days.length === 0) {
             console.error('No data available');
             return;
         }
         
-        // Format dates to show only months
-        const monthLabels = data.dates.map(formatDateToMonth);
-        
-        const ctx = document.getElementById('sp500Chart');
-        const loadingElement = document.getElementById('chart-loading');
+        // Epoch days and integer cents back to month labels and prices
+        const monthLabels = runningSum(data.days).map(day => MONTH_NAMES[new Date(day * 86400000).getUTCMonth()]);
+        data.prices = runningSum(data.prices).map(cents => cents / data.price_scale);
         
         const chart = new Chart(ctx, {
             type: 'line',
@@ -0,0 +1,106 @@
+import json
+import logging
+import mimetypes
+import os
+from typing import Dict, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from middleware import negotiate_encoding
+
+logger = logging.getLogger(__name__)
+
+BUILD_DIRNAME = "build"
+MANIFEST_NAME = "manifest.json"
+
+# Encodings build_assets.py writes next to text assets, in preference order
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "public, no-cache"
+
+
+class AssetManifest:
+    """Maps source paths under static/ to the fingerprinted names from build_assets.py.
+
+    The manifest is read on first use. Without one (build not run) URLs
+    point at the unhashed sources, so development works without a build.
+    """
+
+    def __init__(self, static_dir: str = "static", url_prefix: str = "/static"):
+        self.path = os.path.join(static_dir, BUILD_DIRNAME, MANIFEST_NAME)
+        self.url_prefix = url_prefix.rstrip("/")
+        self._files: Optional[Dict[str, str]] = None
+
+    @property
+    def files(self) -> Dict[str, str]:
+        if self._files is None:
+            try:
+                with open(self.path) as f:
+                    self._files = json.load(f).get("files", {})
+            except FileNotFoundError:
+                logger.warning("No asset manifest at %s; serving unhashed static files", self.path)
+                self._files = {}
+        return self._files
+
+    def url(self, path: str) -> str:
+        path = path.lstrip("/")
+        built = self.files.get(path)
+        if built is None:
+            return f"{self.url_prefix}/{path}"
+        return f"{self.url_prefix}/{BUILD_DIRNAME}/{built}"
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves build-time .br/.gz siblings and sets Cache-Control.
+
+    Fingerprinted files under build/ never change, so they are cached for a
+    year as immutable; anything else must be revalidated (ETag/Last-Modified).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # full path -> available (encoding, sibling path, stat) triples; build files are immutable
+        self._siblings: Dict[str, Tuple[Tuple[str, str, os.stat_result], ...]] = {}
+
+    def siblings(self, full_path: str) -> Tuple[Tuple[str, str, os.stat_result], ...]:
+        found = self._siblings.get(full_path)
+        if found is None:
+            found = []
+            for encoding, suffix in PRECOMPRESSED:
+                try:
+                    found.append((encoding, full_path + suffix, os.stat(full_path + suffix)))
+                except OSError:
+                    continue
+            found = self._siblings[full_path] = tuple(found)
+        return found
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope,
+                      status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        immutable = os.path.relpath(full_path, self.directory).split(os.sep)[0] == BUILD_DIRNAME
+        media_type = mimetypes.guess_type(full_path)[0] or "text/plain"
+
+        response = None
+        siblings = self.siblings(full_path) if immutable else ()
+        if siblings:
+            available = {encoding: (path, stat) for encoding, path, stat in siblings}
+            encoding = negotiate_encoding(request_headers.get("accept-encoding", ""), available)
+            if encoding is not None:
+                path, stat = available[encoding]
+                response = FileResponse(path, status_code=status_code, stat_result=stat, media_type=media_type)
+                response.headers["Content-Encoding"] = encoding
+        if response is None:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result,
+                                    media_type=media_type)
+        if siblings:
+            response.headers["Vary"] = "Accept-Encoding"
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE if immutable else REVALIDATE_CACHE
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,144 @@
+"""Retry and circuit-breaker behaviour of AlpacaClient against the local Alpaca stub."""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+from aiohttp import web
+
+from alpaca_client import AlpacaClient, AlpacaError, CircuitBreaker, CircuitOpenError
+from alpaca_stub import create_stub_app
+
+START, END = "2024-01-01", "2024-01-31"
+
+
+@asynccontextmanager
+async def stub_client(breaker=None, max_retries=3, **stub_options):
+    """An AlpacaClient (no backoff) pointed at a stub on a free local port"""
+    stub = create_stub_app(**stub_options)
+    runner = web.AppRunner(stub)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    client = AlpacaClient(f"http://127.0.0.1:{port}", "key", "secret", max_retries=max_retries,
+                          backoff_base=0, breaker=breaker)
+    try:
+        yield client, stub["stats"]
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+def open_breaker(breaker: CircuitBreaker, elapsed: float = 0.0):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    breaker.opened_at = time.monotonic() - elapsed
+
+
+def test_get_bars_follows_pages():
+    async def scenario():
+        async with stub_client() as (client, stats):
+            bars = await client.get_bars("SPY", START, END, limit=5)
+            assert len(bars) == 23
+            assert stats["requests"] == 5
+
+    asyncio.run(scenario())
+
+
+def test_retries_retryable_status_until_success():
+    async def scenario():
+        async with stub_client(fail_first=2) as (client, stats):
+            assert await client.get_bars("SPY", START, END)
+            assert stats["requests"] == 3
+            assert client.breaker.state == "closed"
+
+    asyncio.run(scenario())
+
+
+def test_gives_up_after_max_retries():
+    async def scenario():
+        async with stub_client(fail_rate=1.0) as (client, stats):
+            with pytest.raises(AlpacaError, match="after 3 attempts"):
+                await client.get_bars("SPY", START, END)
+            assert stats["requests"] == 3
+
+    asyncio.run(scenario())
+
+
+def test_client_error_is_not_retried_and_keeps_breaker_closed():
+    async def scenario():
+        async with stub_client(fail_rate=1.0, fail_status=400) as (client, stats):
+            with pytest.raises(AlpacaError) as excinfo:
+                await client.get_bars("SPY", START, END)
+            assert excinfo.value.status == 400
+            assert stats["requests"] == 1
+            assert client.breaker.failures == 0
+
+    asyncio.run(scenario())
+
+
+def test_breaker_opens_and_fails_fast():
+    async def scenario():
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        async with stub_client(breaker, max_retries=2, fail_rate=1.0) as (client, stats):
+            with pytest.raises(AlpacaError):
+                await client.get_bars("SPY", START, END)
+            assert breaker.state == "open"
+            with pytest.raises(CircuitOpenError):
+                await client.get_bars("SPY", START, END)
+            assert stats["requests"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_half_open_allows_a_single_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    open_breaker(breaker, elapsed=10)
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def test_successful_trial_closes_breaker():
+    async def scenario():
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+        open_breaker(breaker, elapsed=10)
+        async with stub_client(breaker) as (client, stats):
+            assert await client.get_bars("SPY", START, END)
+            assert breaker.state == "closed"
+            assert stats["requests"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_failed_trial_reopens_breaker():
+    async def scenario():
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+        open_breaker(breaker, elapsed=10)
+        async with stub_client(breaker, fail_rate=1.0) as (client, stats):
+            with pytest.raises(CircuitOpenError):
+                await client.get_bars("SPY", START, END)
+            assert breaker.state == "open"
+            assert stats["requests"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_trial_frees_the_breaker():
+    async def scenario():
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+        open_breaker(breaker, elapsed=10)
+        async with stub_client(breaker, latency=1) as (client, stats):
+            trial = asyncio.create_task(client.get_bars("SPY", START, END))
+            while stats["requests"] == 0:
+                await asyncio.sleep(0.01)
+            trial.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await trial
+            assert breaker.state == "half_open"
+            assert breaker.allow()
+
+    asyncio.run(scenario())
@@ -0,0 +1,145 @@
+"""Exports across the archive/hot boundary, and release of export slots."""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from archive import InterestArchive
+from database import Database
+from exports import EXPORT_TABLES, ExportStreams, select_rows, stream_export, with_archive
+
+TABLE = EXPORT_TABLES["interest_data"]
+NOW = datetime(2024, 6, 30, 12)
+DAYS = 10
+ROWS_PER_DAY = 37
+
+
+@pytest.fixture
+def seeded(tmp_path):
+    """A database with DAYS days of clicks, the oldest days archived; yields (db, archive)"""
+    db = Database(str(tmp_path / "app.db"), readers=2)
+
+    def create(conn):
+        conn.execute('''
+            CREATE TABLE interest_data
+            (id INTEGER PRIMARY KEY AUTOINCREMENT,
+             ip_address TEXT,
+             timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)
+        ''')
+        conn.execute('CREATE TABLE counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        conn.execute("INSERT INTO counters (name, value) VALUES ('data_version', 0)")
+        conn.executemany('INSERT INTO interest_data (ip_address, timestamp) VALUES (?, ?)', [
+            (f"10.0.{day}.{i}", f"{NOW - timedelta(days=DAYS - day):%Y-%m-%d} {i // 60:02d}:{i % 60:02d}:00")
+            for day in range(DAYS) for i in range(ROWS_PER_DAY)
+        ])
+
+    db.run_write(create)
+    archive = InterestArchive(db, root=str(tmp_path / "archive"), after_days=6, batch_size=10)
+    assert archive.archive_now(NOW) == 4 * ROWS_PER_DAY
+    yield db, archive
+    db.close()
+
+
+def export(db, archive, since=None, after_id=None, limit=None, batch_size=8):
+    batches = db.iter_batches(*select_rows(TABLE, since, after_id, limit), batch_size)
+    return with_archive(batches, archive, since, after_id, limit)
+
+
+def all_ids():
+    return list(range(1, DAYS * ROWS_PER_DAY + 1))
+
+
+@pytest.mark.parametrize("limit", [1, 7, 50, 148, 1000])
+def test_keyset_pages_return_each_id_once(seeded, limit):
+    db, archive = seeded
+    ids, cursor = [], None
+    while True:
+        page = [row[0] for rows in export(db, archive, after_id=cursor, limit=limit) for row in rows]
+        assert len(page) <= limit
+        if not page:
+            break
+        ids.extend(page)
+        cursor = page[-1]
+    assert ids == all_ids()
+
+
+def test_full_export_is_newest_first_across_the_boundary(seeded):
+    db, archive = seeded
+    ids = [row[0] for rows in export(db, archive) for row in rows]
+    assert ids == all_ids()[::-1]
+
+
+def test_since_filters_archived_and_hot_rows(seeded):
+    db, archive = seeded
+    since = f"{NOW - timedelta(days=DAYS - 2):%Y-%m-%d} 00:00:00"
+    ids = sorted(row[0] for rows in export(db, archive, since=since) for row in rows)
+    assert ids == all_ids()[2 * ROWS_PER_DAY:]
+
+
+def test_archiving_during_an_export_neither_drops_nor_repeats(seeded):
+    db, archive = seeded
+    rows = export(db, archive)
+    ids = [row[0] for row in next(rows)]
+    # The first hot batch pinned the snapshot; now two more days move to Parquet
+    archive.after_days = 4
+    assert archive.archive_now(NOW) == 2 * ROWS_PER_DAY
+    ids.extend(row[0] for batch in rows for row in batch)
+    assert ids == all_ids()[::-1]
+
+
+def test_closing_an_export_early_closes_its_connection(seeded):
+    db, archive = seeded
+    rows = export(db, archive)
+    next(rows)
+    assert db.stats()["streams_open"] == 1
+    rows.close()
+    assert db.stats()["streams_open"] == 0
+
+
+def run_response(response, fail_after: int = 0):
+    """Serve `response` to a fake ASGI client; with `fail_after`, the client drops after that many bodies.
+
+    Returns the bodies sent and whether the response failed.
+    """
+    sent = []
+
+    async def receive():
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.body" and fail_after and len(sent) >= fail_after:
+            raise OSError("client went away")
+        if message["type"] == "http.response.body":
+            sent.append(message.get("body", b""))
+
+    try:
+        asyncio.run(response({"type": "http", "method": "GET", "headers": []}, receive, send))
+    except Exception:  # Starlette may wrap the send error in an ExceptionGroup
+        return sent, True
+    return sent, False
+
+
+def test_export_slot_released_after_a_finished_download(seeded):
+    db, archive = seeded
+    streams = ExportStreams(1)
+    assert streams.acquire()
+    chunks = (f"{row[0]}\n" for rows in export(db, archive) for row in rows)
+    body, failed = run_response(stream_export(chunks, "text/plain", on_close=streams.release))
+    assert not failed
+    assert b"".join(body).decode().split() == [str(i) for i in all_ids()[::-1]]
+    assert streams.open == 0
+    assert db.stats()["streams_open"] == 0
+    assert streams.acquire()
+
+
+def test_export_slot_released_after_an_aborted_download(seeded):
+    db, archive = seeded
+    streams = ExportStreams(1)
+    assert streams.acquire()
+    assert not streams.acquire()
+    chunks = (f"{row[0]}\n" for rows in export(db, archive) for row in rows)
+    body, failed = run_response(stream_export(chunks, "text/plain", on_close=streams.release), fail_after=3)
+    assert failed and len(body) == 3
+    assert streams.open == 0
+    assert db.stats()["streams_open"] == 0
+    assert streams.refused == 1
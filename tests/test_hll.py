@@ -0,0 +1,97 @@
+"""HyperLogLog accuracy, merging and storage, and the visitor sketches built on it."""
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from hll import (
+    PRECISION,
+    STANDARD_ERROR,
+    HyperLogLog,
+    create_hll_schema,
+    estimate_visitors,
+    record_visitors,
+)
+
+
+def ips(start: int, stop: int):
+    return (f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(start, stop))
+
+
+def sketch_of(values) -> HyperLogLog:
+    sketch = HyperLogLog()
+    sketch.update(values)
+    return sketch
+
+
+def interest_db() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    conn.execute('''
+        CREATE TABLE interest_data
+        (id INTEGER PRIMARY KEY AUTOINCREMENT,
+         ip_address TEXT,
+         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)
+    ''')
+    return conn
+
+
+@pytest.mark.parametrize("count", [10, 1_000, 10_000, 100_000])
+def test_estimate_within_three_standard_errors(count):
+    sketch = sketch_of(ips(0, count))
+    assert sketch.precision == PRECISION
+    assert abs(sketch.estimate() - count) <= max(1, 3 * STANDARD_ERROR * count)
+
+
+def test_duplicates_do_not_change_the_sketch():
+    sketch = sketch_of(ips(0, 5_000))
+    before = sketch.to_bytes()
+    assert not sketch.update(ips(0, 5_000))
+    assert sketch.to_bytes() == before
+
+
+def test_merge_equals_sketch_of_union():
+    left, right = sketch_of(ips(0, 30_000)), sketch_of(ips(20_000, 50_000))
+    left.merge(right)
+    assert left.to_bytes() == sketch_of(ips(0, 50_000)).to_bytes()
+    assert abs(left.estimate() - 50_000) <= 3 * STANDARD_ERROR * 50_000
+
+
+def test_merge_rejects_other_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog().merge(HyperLogLog(precision=10))
+
+
+def test_registers_round_trip():
+    sketch = sketch_of(ips(0, 2_000))
+    restored = HyperLogLog(sketch.to_bytes())
+    assert restored.precision == sketch.precision
+    assert restored.to_bytes() == sketch.to_bytes()
+    assert restored.estimate() == sketch.estimate()
+
+
+def test_recorded_visitors_survive_storage_and_skip_missing_ips():
+    conn = interest_db()
+    cursor = conn.cursor()
+    create_hll_schema(cursor)
+    today = datetime(2024, 5, 10, 12)
+    record_visitors(cursor, today, list(ips(0, 600)) + [None])
+    record_visitors(cursor, today - timedelta(days=3), ips(400, 1_000))
+    record_visitors(cursor, today, [None])
+
+    counts = estimate_visitors(conn, today.date())
+    assert abs(counts["today"] - 600) <= 3 * STANDARD_ERROR * 600
+    assert abs(counts["week"] - 1_000) <= 3 * STANDARD_ERROR * 1_000
+    assert counts["all_time"] == counts["week"]
+
+
+def test_backfill_matches_recording():
+    conn = interest_db()
+    today = datetime(2024, 5, 10, 12)
+    rows = [(ip, f"{today:%Y-%m-%d} 09:00:00") for ip in ips(0, 800)] + [(None, f"{today:%Y-%m-%d} 09:00:00")]
+    conn.executemany('INSERT INTO interest_data (ip_address, timestamp) VALUES (?, ?)', rows)
+    create_hll_schema(conn.cursor())  # backfills an empty sketch table
+
+    recorded = interest_db()
+    create_hll_schema(recorded.cursor())
+    record_visitors(recorded.cursor(), today, (ip for ip, _ in rows))
+    assert estimate_visitors(conn, today.date()) == estimate_visitors(recorded, today.date())
@@ -0,0 +1,59 @@
+"""Time-bucket rollups behind /admin/timeseries: insert-time updates against a backfill."""
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from rollups import create_rollup_schema, query_timeseries, record_rollups
+
+NOW = datetime(2024, 5, 10, 12, 30)
+
+
+def raw_db() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    conn.execute('CREATE TABLE interest_data (id INTEGER PRIMARY KEY, ip_address TEXT, timestamp DATETIME)')
+    conn.execute('CREATE TABLE email_subscribers (id INTEGER PRIMARY KEY, email TEXT, timestamp DATETIME)')
+    return conn
+
+
+def clicks():
+    """(time, ip) pairs over two days; some IPs repeat and some are missing"""
+    for i in range(300):
+        yield NOW - timedelta(minutes=7 * i), (f"10.0.0.{i % 40}" if i % 9 else None)
+
+
+def test_recorded_rollups_match_backfill():
+    recorded = raw_db()
+    create_rollup_schema(recorded.cursor())
+    for when, ip in sorted(clicks()):
+        record_rollups(recorded.cursor(), "interest", when, 1, [ip])
+
+    backfilled = raw_db()
+    backfilled.executemany('INSERT INTO interest_data (ip_address, timestamp) VALUES (?, ?)',
+                           [(ip, f"{when:%Y-%m-%d %H:%M:%S}") for when, ip in clicks()])
+    create_rollup_schema(backfilled.cursor())  # backfills an empty rollups table
+
+    start = NOW - timedelta(days=3)
+    for bucket in ("minute", "hour", "day"):
+        expected = query_timeseries(backfilled, "interest", bucket, start, NOW + timedelta(days=1))
+        assert query_timeseries(recorded, "interest", bucket, start, NOW + timedelta(days=1)) == expected
+    days = query_timeseries(recorded, "interest", "day", start)
+    assert sum(point["count"] for point in days) == 300
+
+
+def test_unique_ips_per_bucket():
+    conn = raw_db()
+    create_rollup_schema(conn.cursor())
+    record_rollups(conn.cursor(), "interest", NOW, 3, ["1.1.1.1", "2.2.2.2", "1.1.1.1"])
+    record_rollups(conn.cursor(), "interest", NOW, 2, ["2.2.2.2", None])
+    [point] = query_timeseries(conn, "interest", "hour", NOW - timedelta(hours=1), NOW + timedelta(hours=1))
+    assert point == {"start": "2024-05-10 12:00:00", "count": 5, "unique_ips": 2}
+
+
+def test_rejects_unknown_metric_and_bucket():
+    conn = raw_db()
+    create_rollup_schema(conn.cursor())
+    with pytest.raises(ValueError):
+        query_timeseries(conn, "pageviews", "hour")
+    with pytest.raises(ValueError):
+        query_timeseries(conn, "interest", "week")
@@ -0,0 +1,98 @@
+"""LTTB downsampling and the compact /sp500-data encodings."""
+import itertools
+import math
+import random
+import struct
+from datetime import date, timedelta
+
+import pytest
+
+from series import (
+    EPOCH,
+    MIN_POINTS,
+    PRICE_SCALE,
+    downsample_columns,
+    downsample_series,
+    encode_binary,
+    encode_delta,
+    lttb,
+)
+
+
+def prices(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [round(100 + 10 * math.sin(i / 20) + rng.uniform(-2, 2), 2) for i in range(n)]
+
+
+def trading_days(n: int):
+    days = (date(2020, 1, 1) + timedelta(days=i) for i in itertools.count())
+    return [f"{day.isoformat()}T04:00:00Z" for day in itertools.islice((d for d in days if d.weekday() < 5), n)]
+
+
+@pytest.mark.parametrize("threshold", [MIN_POINTS, 10, 250, 999])
+def test_lttb_keeps_endpoints_and_threshold(threshold):
+    values = prices(1000)
+    kept = lttb(values, threshold)
+    assert len(kept) == threshold
+    assert kept[0] == 0 and kept[-1] == len(values) - 1
+    assert kept == sorted(set(kept))
+
+
+def test_lttb_keeps_the_extreme_point():
+    values = [0.0] * 500
+    values[321] = 50.0
+    assert 321 in lttb(values, 20)
+
+
+@pytest.mark.parametrize("threshold", [len(prices(50)), 100, MIN_POINTS - 1])
+def test_lttb_returns_everything_when_not_reducing(threshold):
+    assert lttb(prices(50), threshold) == list(range(50))
+
+
+@pytest.mark.parametrize("symbols, max_points", [(1, 100), (3, 10), (10, 10), (10, 3), (40, 25)])
+def test_downsample_columns_respects_max_points(symbols, max_points):
+    columns = []
+    for seed in range(symbols):
+        column = prices(800, seed)
+        # Symbols listed later have no bars at the start
+        columns.append([None] * (seed * 10) + column[seed * 10:])
+    kept = downsample_columns(columns, max_points)
+    assert len(kept) <= max_points
+    assert kept == sorted(set(kept))
+    assert all(0 <= i < 800 for i in kept)
+    assert kept[0] == 0 and kept[-1] == 799
+
+
+def test_downsample_columns_keeps_short_series():
+    assert downsample_columns([prices(5), prices(5, 1)], 10) == list(range(5))
+    assert downsample_columns([], 10) == []
+
+
+def test_downsample_series_keeps_pairs_aligned():
+    dates, values = trading_days(400), prices(400)
+    kept_dates, kept_values = downsample_series(dates, values, 40)
+    assert len(kept_dates) == len(kept_values) == 40
+    by_date = dict(zip(dates, values))
+    assert all(by_date[d] == v for d, v in zip(kept_dates, kept_values))
+
+
+def test_delta_encoding_decodes_to_input():
+    dates, values = trading_days(300), prices(300)
+    encoded = encode_delta(dates, values)
+    assert encoded["encoding"] == "delta" and encoded["price_scale"] == PRICE_SCALE
+
+    days = list(itertools.accumulate(encoded["days"]))
+    cents = list(itertools.accumulate(encoded["prices"]))
+    assert [(EPOCH + timedelta(days=d)).isoformat() for d in days] == [t[:10] for t in dates]
+    assert [c / PRICE_SCALE for c in cents] == values
+
+
+def test_binary_encoding_decodes_to_input():
+    dates, values = trading_days(300), prices(300)
+    body = encode_binary(dates, values)
+    (count,) = struct.unpack_from("<I", body)
+    assert count == 300 and len(body) == 4 + 8 * count
+    days = struct.unpack_from(f"<{count}i", body, 4)
+    floats = struct.unpack_from(f"<{count}f", body, 4 + 4 * count)
+    assert [(EPOCH + timedelta(days=d)).isoformat() for d in days] == [t[:10] for t in dates]
+    assert floats == pytest.approx(values, rel=1e-6)
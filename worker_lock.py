@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: one worker only, so it always owns the jobs
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerLock:
+    """Elect the one worker process that runs the background jobs.
+
+    The owner holds an exclusive `flock` on `path` for as long as it lives;
+    the kernel drops it when the process exits, however it exits. The other
+    workers retry every `retry_interval` seconds, so a restarted or crashed
+    owner is replaced without coordination.
+    """
+
+    def __init__(self, path: str, retry_interval: float = 30.0):
+        self.path = path
+        self.retry_interval = retry_interval
+        self._fd: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def owner(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+        if fcntl is None:
+            self._fd = -1
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self._fd = fd
+        return True
+
+    async def start(self, on_acquire: Callable[[], Awaitable[None]]):
+        """Run `on_acquire` now if this worker wins the lock, otherwise once it does"""
+        if self.try_acquire():
+            await on_acquire()
+            return
+        logger.info("Background jobs run in another worker; pid %d will retry", os.getpid())
+        self._task = asyncio.get_running_loop().create_task(self._retry(on_acquire))
+
+    async def _retry(self, on_acquire: Callable[[], Awaitable[None]]):
+        while not self.try_acquire():
+            await asyncio.sleep(self.retry_interval)
+        logger.info("Pid %d took over the background jobs", os.getpid())
+        await on_acquire()
+
+    async def stop(self):
+        """Stop competing for the lock; an owner keeps it until `release()`"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def release(self):
+        if self._fd is not None:
+            if self._fd >= 0:
+                os.close(self._fd)
+            self._fd = None
+
+    def stats(self) -> dict:
+        return {"owner": self.owner, "pid": os.getpid()}
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WriteRequest(NamedTuple):
+    kind: str
+    args: tuple
+    future: asyncio.Future
+
+
+class WriteQueue:
+    """Group-commit write path with a single writer task.
+
+    Requests are queued by `submit()` and drained by one writer task, which
+    hands up to `max_batch` of them (or whatever arrived within `max_delay`
+    seconds of the first) to `apply_batch` in a dedicated thread. The batch
+    function commits them in one transaction and returns one result per
+    request, in order; a returned exception instance fails only that
+    request, a raised exception fails the whole batch.
+    """
+
+    def __init__(self, apply_batch: Callable[[List[WriteRequest]], List[Any]],
+                 max_batch: int = 500, max_delay: float = 0.005):
+        self._apply_batch = apply_batch
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.batches = 0
+        self.writes = 0
+
+    async def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            # One thread so the writer connection never migrates between threads
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Flush everything already queued, then stop the writer"""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        self._executor.shutdown(wait=True)
+
+    async def submit(self, kind: str, *args) -> Any:
+        if self._task is None:
+            raise RuntimeError("Write queue is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(WriteRequest(kind, args, future))
+        return await future
+
+    async def _collect(self, first: WriteRequest) -> tuple:
+        """Gather a batch starting with `first`; returns (batch, stop_requested)"""
+        batch = [first]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch, stopping = await self._collect(first)
+
+            try:
+                results = await loop.run_in_executor(self._executor, self._apply_batch, batch)
+            except Exception as e:
+                logger.exception("Write batch of %d failed", len(batch))
+                results = [e] * len(batch)
+
+            self.batches += 1
+            self.writes += len(batch)
+            for request, result in zip(batch, results):
+                if request.future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    request.future.set_exception(result)
+                else:
+                    request.future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "writes": self.writes,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+        }